@@ -0,0 +1,69 @@
+"""
+Bulk update through a temporary table.
+
+Rows are streamed with COPY into a temporary table, shaped like the columns
+to update, then the table is updated with a single UPDATE ... FROM.
+Unlike bulk_update, there is no CASE WHEN expression per column and row,
+so large JSON values of many rows are neither inlined nor planned.
+PostgreSQL only.
+
+"""
+
+from io import StringIO
+
+from django.db import connection, transaction
+from django.db.models import Model
+
+# Escapes of the COPY text format.
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+COPY_NULL = '\\N'
+
+
+def copy_value(value) -> str:
+    if value is None:
+        return COPY_NULL
+    return str(value).translate(COPY_ESCAPES)
+
+
+def copy_rows(objs: list, fields: list) -> StringIO:
+    # Rows of the objects in the COPY text format: pk and the fields to update.
+    buffer = StringIO()
+    pk = objs[0]._meta.pk
+    for obj in objs:
+        values = [pk.get_db_prep_save(obj.pk, connection)]
+        values.extend(field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields)
+        buffer.write('\t'.join(copy_value(value) for value in values) + '\n')
+    buffer.seek(0)
+
+    return buffer
+
+
+def copy_update(model: type[Model], objs: list, fields: list) -> int:
+    # Update the fields of the objects with one UPDATE statement.
+    # Return the number of updated rows.
+    if not objs:
+        return 0
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in fields]
+    table = quote(model._meta.db_table)
+    tmp_table = quote(f'tmp_{model._meta.model_name}_update')
+    pk_column = quote(model._meta.pk.column)
+    columns = [quote(field.column) for field in fields]
+    assignments = ', '.join(f'{column} = tmp.{column}' for column in columns)
+
+    # The temporary table is dropped at the end of the transaction.
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {tmp_table}')
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {tmp_table} ON COMMIT DROP AS '
+            f'SELECT {pk_column}, {", ".join(columns)} FROM {table} WITH NO DATA'
+        )
+        cursor.copy_expert(
+            f'COPY {tmp_table} ({pk_column}, {", ".join(columns)}) FROM STDIN',
+            copy_rows(objs, fields),
+        )
+        cursor.execute(
+            f'UPDATE {table} AS target SET {assignments} '
+            f'FROM {tmp_table} AS tmp WHERE target.{pk_column} = tmp.{pk_column}'
+        )
+        return cursor.rowcount
@@ -1,7 +1,7 @@
 import uuid
 
 from datetime import datetime
-from django.db import models
+from django.db import connection, models
 from django.db.models import F, Q, Sum, QuerySet
 from django.db.models.fields.json import KeyTextTransform
 from django.template.defaultfilters import slugify
@@ -32,6 +32,8 @@ class Tournament(UUIDMixin):
     av_attack = models.FloatField(default=0)
     av_goals_number = models.FloatField(default=1.25)
     standings = models.JSONField(blank=True, null=True)
+    standings_updated = models.DateTimeField(blank=True, null=True)
+    scores_checked = models.DateTimeField(blank=True, null=True)
     bookies_standings = models.JSONField(blank=True, null=True)
     predicted_standings = models.JSONField(blank=True, null=True)
     is_championship = models.BooleanField(default=True)
@@ -47,7 +49,7 @@ class Tournament(UUIDMixin):
 
 
 class Team(UUIDMixin):
-    api_team_id = models.IntegerField(blank=True, null=True)
+    api_team_id = models.IntegerField(blank=True, null=True, unique=True)
     name = models.CharField(_('name'), max_length=255)
     short_name = models.CharField(_('short_name'), max_length=255)
     city = models.CharField(max_length=255, blank=True, null=True)
@@ -203,6 +205,13 @@ class Game(UUIDMixin):
     away_team_attack = models.IntegerField(blank=True, null=True)
     home_team_class = models.IntegerField(blank=True, null=True)
     away_team_class = models.IntegerField(blank=True, null=True)
+    home_win_prob = models.FloatField(blank=True, null=True, db_index=True)
+    draw_prob = models.FloatField(blank=True, null=True, db_index=True)
+    away_win_prob = models.FloatField(blank=True, null=True, db_index=True)
+    under_prob = models.FloatField(blank=True, null=True, db_index=True)
+    over_prob = models.FloatField(blank=True, null=True, db_index=True)
+    odds_checked = models.DateTimeField(blank=True, null=True)
+    odds_unchanged = models.IntegerField(blank=True, null=True)
     prediction = models.JSONField(blank=True, null=True)
     preview = models.JSONField(blank=True, null=True)
     report = models.JSONField(blank=True, null=True)
@@ -215,6 +224,7 @@ class Game(UUIDMixin):
     home_team_last_tour_games = models.JSONField(blank=True, null=True)
     away_team_last_tour_games = models.JSONField(blank=True, null=True)
     slug = models.SlugField(max_length=100, blank=True, null=True, unique=True)
+    payload_hash = models.CharField(max_length=32, blank=True, null=True)
 
     objects = GameManager()
 
@@ -224,3 +234,58 @@ class Game(UUIDMixin):
     class Meta:
         db_table = 'content\".\"game'
         ordering = ['-game_date']
+
+
+class OddsHistoryManager(models.Manager):
+
+    def get_open_last(self, game_ids: list) -> dict:
+        # Rebuild the [open, last] view of the odds:
+        # {game_id: {market: {selection: [open price, last price]}}}.
+        odds = {}
+        games_odds = self.filter(game_id__in=game_ids)
+        for ordering, position in (('taken_at', 0), ('-taken_at', 1)):
+            prices = games_odds.order_by('game_id', 'market', 'selection', ordering).distinct(
+                'game_id', 'market', 'selection',
+            ).values_list('game_id', 'market', 'selection', 'price')
+            for game_id, market, selection, price in prices:
+                odds.setdefault(game_id, {}).setdefault(market, {}).setdefault(selection, [1, 1])
+                odds[game_id][market][selection][position] = price
+
+        return odds
+
+    def compact(self, game_date_before: datetime, game_date_after: datetime) -> int:
+        # Keep only the first and the last prices of the games,
+        # that took place within [after, before). Return the number of deleted rows.
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        game_table = connection.ops.quote_name(Game._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE id IN ('
+                f'SELECT id FROM ('
+                f'SELECT odds.id, '
+                f'row_number() OVER (PARTITION BY odds.game_id, odds.market, odds.selection '
+                f'ORDER BY odds.taken_at) AS position, '
+                f'count(*) OVER (PARTITION BY odds.game_id, odds.market, odds.selection) AS total '
+                f'FROM {table} AS odds JOIN {game_table} AS game ON game.id = odds.game_id '
+                f'WHERE game.game_date >= %s AND game.game_date < %s) AS history '
+                f'WHERE position > 1 AND position < total)',
+                [game_date_after, game_date_before],
+            )
+            return cursor.rowcount
+
+
+class OddsHistory(models.Model):
+    # Averaged prices of the game odds, one row per update.
+    game = models.ForeignKey('Game', on_delete=models.CASCADE, related_name='odds_history')
+    market = models.CharField(max_length=255)
+    selection = models.CharField(max_length=255)
+    taken_at = models.DateTimeField()
+    price = models.FloatField()
+
+    objects = OddsHistoryManager()
+
+    class Meta:
+        db_table = 'content\".\"odds_history'
+        indexes = [
+            models.Index(fields=['game', 'market', 'selection', 'taken_at'], name='odds_history_game_idx'),
+        ]
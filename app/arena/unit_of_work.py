@@ -0,0 +1,88 @@
+"""
+Unit of work for bulk updates.
+
+Objects are registered before they are modified: values of the tracked
+fields are stored as a snapshot. On flush only the fields, that differ
+from the snapshot, are written, with one bulk update per set of changed
+fields. Objects without changes are not written at all.
+Changes are written by one of the backends, chosen per unit of work:
+- 'bulk_update': Django bulk_update in batches;
+- 'copy': COPY to a temporary table and one UPDATE per set of fields
+  (see arena.copy_update), for large JSON values of many rows.
+
+"""
+
+from collections import defaultdict
+from copy import deepcopy
+from typing import Iterable, Union
+
+from django.db.models import Model
+
+from arena.copy_update import copy_update
+
+BACKENDS = ('bulk_update', 'copy')
+
+
+class UnitOfWork:
+
+    def __init__(
+            self,
+            model: type[Model],
+            fields: Union[list, tuple] = None,
+            batch_size: int = 100,
+            backend: str = 'bulk_update'):
+        if backend not in BACKENDS:
+            raise ValueError(f'Unknown backend {backend!r}, expected one of {BACKENDS}.')
+        self.model = model
+        concrete_fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        if fields is not None:
+            concrete_fields = [field for field in concrete_fields if field.name in fields]
+        self.fields = concrete_fields
+        self.batch_size = batch_size
+        self.backend = backend
+        # {pk: (obj, {field name: value})}
+        self.tracked = {}
+
+    def track(self, obj: Model) -> Model:
+        # Register the object, return the instance, that is tracked for its pk.
+        if obj.pk in self.tracked:
+            return self.tracked[obj.pk][0]
+        self.tracked[obj.pk] = (obj, self.snapshot(obj))
+        return obj
+
+    def track_all(self, objs: Iterable[Model]) -> list:
+        # Evaluate a queryset once and register its objects.
+        return [self.track(obj) for obj in objs]
+
+    def snapshot(self, obj: Model) -> dict:
+        # JSON values are copied: they are often modified in place.
+        return {field.name: deepcopy(getattr(obj, field.attname)) for field in self.fields}
+
+    def dirty_fields(self, obj: Model) -> tuple:
+        _, snapshot = self.tracked[obj.pk]
+        return tuple(
+            field.name for field in self.fields
+            if getattr(obj, field.attname) != snapshot[field.name]
+        )
+
+    def flush(self, objs: Iterable[Model] = None) -> int:
+        # Write changed fields of the objects (all tracked by default) and forget them.
+        # Return the number of updated rows.
+        pks = list(self.tracked) if objs is None else list(dict.fromkeys(obj.pk for obj in objs))
+        groups = defaultdict(list)
+        for pk in pks:
+            obj, _ = self.tracked[pk]
+            dirty_fields = self.dirty_fields(obj)
+            if dirty_fields:
+                groups[dirty_fields].append(obj)
+            del self.tracked[pk]
+        updated = 0
+        for dirty_fields, dirty_objs in groups.items():
+            updated += self.write(dirty_objs, dirty_fields)
+
+        return updated
+
+    def write(self, objs: list, fields: tuple) -> int:
+        if self.backend == 'copy':
+            return copy_update(self.model, objs, fields)
+        return self.model.objects.bulk_update(objs, fields, batch_size=self.batch_size)
@@ -0,0 +1,114 @@
+"""
+Benchmark of the details pipeline.
+
+Games details are parsed from the local stand-in of the API
+(see benchmarks.mock_api) twice: by the sequential loop, where a batch
+is written to the DB before the next one is requested, and by
+DetailsUpdatesManager, where the writer thread saves a batch
+while the next one is being fetched. The wall-clock time of each run is reported.
+Synthetic tournaments, their games and teams are deleted at the end.
+
+Use a scratch DB. Run from the app directory:
+python -m benchmarks.details_pipeline [--fixtures 6000] [--leagues 20] [--rounds 2]
+
+"""
+
+import os
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from asgiref.sync import sync_to_async
+
+from arena.models import Game
+from benchmarks.mock_api import (FIRST_LEAGUE_ID, get_arguments, make_mock,
+                                 start_in_thread, stop_in_thread)
+from benchmarks.scout_load import create_tours, delete_tours
+from scout import update_details, update_scores
+from scout.cache import ResponseCache
+from scout.client import api_client
+from scout.lookups import lookups
+from scout.rate_limiter import RateLimiter
+from scout.updates_managers import CHECKPOINT_SIZE, DetailsUpdatesManager
+
+DETAILS_FIELDS = ('game_events', 'lineups', 'home_team_stats', 'away_team_stats')
+
+
+class SequentialDetailsUpdatesManager(DetailsUpdatesManager):
+    # The loop before the pipeline: fetching waits for every checkpoint to be written.
+
+    async def update(self) -> None:
+        games_to_parse = await sync_to_async(self.get_games_to_parse)()
+        checkpoint = {}
+        async for games_details in self.parser.batches(games_to_parse):
+            if games_details:
+                await sync_to_async(self.journal.append)(games_details)
+                checkpoint.update(games_details)
+            if len(checkpoint) >= CHECKPOINT_SIZE:
+                await sync_to_async(self.save_details)(checkpoint)
+                checkpoint = {}
+        if checkpoint:
+            await sync_to_async(self.save_details)(checkpoint)
+        await sync_to_async(self.journal.clear)()
+
+
+def synthetic_games():
+    return Game.objects.filter(tournament__api_tour_id__gte=FIRST_LEAGUE_ID)
+
+
+def reset_details() -> None:
+    synthetic_games().update(**{field: None for field in DETAILS_FIELDS})
+
+
+def run(manager_class) -> tuple:
+    # Return the wall-clock time and the number of games with details.
+    reset_details()
+    manager = update_details.manager()
+    manager = manager_class(updater=manager.updater, parser=manager.parser)
+    manager.journal.clear()
+    start = time.perf_counter()
+    try:
+        api_client.run(manager.update())
+    finally:
+        api_client.close()
+    wall_time = time.perf_counter() - start
+
+    return wall_time, synthetic_games().filter(lineups__isnull=False).count()
+
+
+def main() -> None:
+    parser = get_arguments()
+    parser.set_defaults(fixtures=6000, minute_limit=100000, daily_limit=10 ** 7)
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--rounds', type=int, default=2, help='Runs of each manager, taken in turns.')
+    arguments = parser.parse_args()
+
+    mock = make_mock(arguments)
+    loop, runner = start_in_thread(mock, port=arguments.port)
+    api_client.base_url = f'http://127.0.0.1:{arguments.port}/v3'
+    api_client.cache = ResponseCache(mode='off')
+    # The benchmark measures the pipeline, not the quota.
+    api_client.limiter = RateLimiter(requests_per_minute=arguments.minute_limit)
+
+    create_tours(arguments.leagues)
+    try:
+        lookups.clear()
+        try:
+            api_client.run(update_scores.manager().update())
+        finally:
+            api_client.close()
+        print(f'{arguments.leagues} leagues, {arguments.fixtures} fixtures, {synthetic_games().count()} games.')
+        for round_number in range(1, arguments.rounds + 1):
+            for manager_class in (SequentialDetailsUpdatesManager, DetailsUpdatesManager):
+                wall_time, games = run(manager_class)
+                print(f'Round {round_number}, {manager_class.__name__}: {wall_time:.2f} s, {games} games.')
+    finally:
+        stop_in_thread(loop, runner)
+        delete_tours(arguments.leagues)
+
+
+if __name__ == '__main__':
+    main()
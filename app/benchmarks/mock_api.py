@@ -0,0 +1,211 @@
+"""
+Local stand-in of the API.
+
+Serves the endpoints used by scout: fixtures, fixtures/events,
+fixtures/lineups, fixtures/statistics, odds and standings.
+Responses are synthetic (see benchmarks.synthetic) or recorded
+by the responses cache (API_CACHE_MODE=record, see scout.cache).
+Latency, quota headers and 429 responses are simulated.
+
+Run from the app directory:
+python -m benchmarks.mock_api [--port 8080] [--leagues 20] [--fixtures 2000]
+and set API_BASE_URL=http://127.0.0.1:8080/v3.
+
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from aiohttp import web
+
+from benchmarks.synthetic import (make_events, make_fixtures, make_lineups,
+                                  make_odds, make_standings, make_statistics)
+
+# Ids of the synthetic leagues, far from the ids of the real ones.
+FIRST_LEAGUE_ID = 1000000
+SEASON = 2022
+DETAILS = {
+    'fixtures/events': make_events,
+    'fixtures/lineups': make_lineups,
+    'fixtures/statistics': make_statistics,
+}
+
+
+class MockAPI:
+
+    def __init__(
+            self,
+            fixtures: list,
+            latency: tuple = (0.05, 0.2),
+            minute_limit: int = 300,
+            daily_limit: int = 75000,
+            error_rate: float = 0,
+            recorded: str = None):
+        self.fixtures = {fixture['fixture']['id']: fixture for fixture in fixtures}
+        self.leagues = defaultdict(list)
+        for fixture in fixtures:
+            self.leagues[fixture['league']['id']].append(fixture)
+        self.latency = latency
+        self.minute_limit = minute_limit
+        self.daily_limit = daily_limit
+        self.daily_remaining = daily_limit
+        self.error_rate = error_rate
+        self.recorded = None
+        if recorded:
+            # Imported only here: the cache needs the settings of the app.
+            from scout.cache import ResponseCache
+            self.recorded = ResponseCache(mode='replay', directory=recorded)
+        self.minute = None
+        self.minute_remaining = minute_limit
+        # Requests, 429 responses and bytes sent by endpoints.
+        self.stats = Counter()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/v3/{endpoint:.+}', self.handle)
+        return app
+
+    def quota_headers(self) -> dict:
+        return {
+            'x-ratelimit-limit': str(self.minute_limit),
+            'x-ratelimit-remaining': str(max(self.minute_remaining, 0)),
+            'x-ratelimit-requests-limit': str(self.daily_limit),
+            'x-ratelimit-requests-remaining': str(max(self.daily_remaining, 0)),
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        endpoint = request.match_info['endpoint']
+        params = dict(request.query)
+        self.stats['requests'] += 1
+        self.stats[f'requests:{endpoint}'] += 1
+        await asyncio.sleep(random.uniform(*self.latency))
+
+        # Per-minute window of the quota.
+        minute = int(time.time() // 60)
+        if minute != self.minute:
+            self.minute = minute
+            self.minute_remaining = self.minute_limit
+        if self.minute_remaining <= 0 or random.random() < self.error_rate:
+            self.stats['429'] += 1
+            retry_after = 60 - int(time.time() % 60) if self.minute_remaining <= 0 else 1
+            return web.Response(
+                status=429,
+                headers={**self.quota_headers(), 'Retry-After': str(retry_after)},
+            )
+        self.minute_remaining -= 1
+        self.daily_remaining -= 1
+
+        response = self.response(endpoint, params)
+        body = json.dumps({
+            'get': endpoint,
+            'parameters': params,
+            'errors': [],
+            'results': len(response),
+            'paging': {'current': 1, 'total': 1},
+            'response': response,
+        })
+        self.stats['bytes'] += len(body)
+        return web.Response(text=body, content_type='application/json', headers=self.quota_headers())
+
+    def response(self, endpoint: str, params: dict) -> list:
+        if self.recorded is not None:
+            recorded = self.recorded.get(endpoint, params)
+            if recorded is not None:
+                return recorded
+        if endpoint == 'fixtures':
+            return self.fixtures_response(params)
+        if endpoint in DETAILS:
+            fixture = self.fixtures.get(int(params.get('fixture', 0)))
+            return DETAILS[endpoint](fixture) if fixture else []
+        if endpoint == 'odds':
+            fixture = self.fixtures.get(int(params.get('fixture', 0)))
+            return make_odds(fixture) if fixture and fixture['fixture']['status']['short'] == 'NS' else []
+        if endpoint == 'standings':
+            league_id = int(params.get('league', 0))
+            return make_standings(league_id, SEASON, self.leagues[league_id]) if league_id in self.leagues else []
+        return []
+
+    def fixtures_response(self, params: dict) -> list:
+        if 'ids' in params:
+            fixtures = [self.fixtures.get(int(api_game_id)) for api_game_id in params['ids'].split('-')]
+            # Fixtures requested by ids come with their details.
+            return [
+                {
+                    **fixture,
+                    'events': make_events(fixture),
+                    'lineups': make_lineups(fixture),
+                    'statistics': make_statistics(fixture),
+                }
+                for fixture in fixtures
+                if fixture is not None
+            ]
+        if 'live' in params:
+            return []
+        if 'date' in params:
+            return [
+                fixture for fixture in self.fixtures.values()
+                if fixture['fixture']['date'][:10] == params['date']
+            ]
+        fixtures = self.leagues.get(int(params.get('league', 0)), [])
+        date_from = params.get('from', '')
+        date_to = params.get('to', '9999')
+        return [fixture for fixture in fixtures if date_from <= fixture['fixture']['date'][:10] <= date_to]
+
+
+def start_in_thread(mock: MockAPI, host: str = '127.0.0.1', port: int = 8080) -> tuple:
+    # Serve the mock in a thread with its own event loop, return the loop and the runner.
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(mock.app())
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, host, port).start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    return loop, runner
+
+
+def stop_in_thread(loop: asyncio.AbstractEventLoop, runner: web.AppRunner) -> None:
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def get_arguments(parser: argparse.ArgumentParser = None) -> argparse.ArgumentParser:
+    parser = parser or argparse.ArgumentParser(description='Local stand-in of the API.')
+    parser.add_argument('--leagues', type=int, default=20)
+    parser.add_argument('--fixtures', type=int, default=2000)
+    parser.add_argument('--latency', type=float, nargs=2, default=(0.05, 0.2), metavar=('MIN', 'MAX'))
+    parser.add_argument('--minute-limit', type=int, default=300)
+    parser.add_argument('--daily-limit', type=int, default=75000)
+    parser.add_argument('--error-rate', type=float, default=0, help='Share of random 429 responses.')
+    parser.add_argument('--recorded', help='Directory of the recorded responses (scout.cache).')
+
+    return parser
+
+
+def make_mock(arguments: argparse.Namespace) -> MockAPI:
+    leagues = [FIRST_LEAGUE_ID + i for i in range(arguments.leagues)]
+    fixtures = make_fixtures(arguments.fixtures, leagues, season=SEASON, first_id=10 ** 9)
+    return MockAPI(
+        fixtures,
+        latency=tuple(arguments.latency),
+        minute_limit=arguments.minute_limit,
+        daily_limit=arguments.daily_limit,
+        error_rate=arguments.error_rate,
+        recorded=arguments.recorded,
+    )
+
+
+def main() -> None:
+    parser = get_arguments()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    arguments = parser.parse_args()
+    web.run_app(make_mock(arguments).app(), host=arguments.host, port=arguments.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark of the scores transform.
+
+Compare the conversion of API fixtures into game rows (GameRow tuples)
+with the former path: pydantic model and Game instance for each game.
+
+Run from the app directory:
+python -m benchmarks.scores_transform [fixtures_number]
+
+"""
+
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Union
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.template.defaultfilters import slugify
+from pydantic import BaseModel
+
+from arena.models import Game, Team, Tournament
+from benchmarks.synthetic import make_fixtures
+from scout.updaters import PUB_DATE_MIN, PUB_DATE_NORM, ScoresUpdater
+
+LEAGUES = list(range(1, 21))
+
+
+class GameModel(BaseModel):
+    # The former validation model of the API games.
+    api_game_id: int
+    game_date: datetime
+    venue: Union[str, None]
+    city: Union[str, None]
+    referee: Union[str, None]
+    status: str
+    season: int
+    round: Union[str, None]
+    home_goals_ht: Union[int, None]
+    away_goals_ht: Union[int, None]
+    home_goals_ft: Union[int, None]
+    away_goals_ft: Union[int, None]
+    home_goals_et: Union[int, None]
+    away_goals_et: Union[int, None]
+    home_goals_pen: Union[int, None]
+    away_goals_pen: Union[int, None]
+    pub_date: Union[datetime, None]
+    slug: str
+    payload_hash: str
+
+
+def former_transform(games: list, tours: dict, teams_objs: dict, hashes: dict) -> dict:
+    data_to_load = {}
+    for game in games:
+        tour = tours.get(game['league']['id'])
+        home_team = teams_objs.get(game['teams']['home']['id'])
+        away_team = teams_objs.get(game['teams']['away']['id'])
+        game_date = datetime.fromisoformat(game['fixture']['date'])
+
+        normal_pub_date = (game_date - timedelta(hours=PUB_DATE_NORM)).astimezone()
+        earliest_pub_date = (datetime.now() + timedelta(hours=PUB_DATE_MIN)).astimezone()
+        pub_date = max(normal_pub_date, earliest_pub_date)
+        if pub_date > game_date + timedelta(hours=4):
+            pub_date = None
+        slug = slugify('-'.join([game_date.strftime('%Y-%m-%d'), home_team.name, away_team.name]))
+
+        validated_game_data = GameModel(
+            api_game_id=game['fixture']['id'],
+            game_date=game_date,
+            venue=game['fixture']['venue']['name'],
+            city=game['fixture']['venue']['city'],
+            referee=game['fixture']['referee'],
+            status=game['fixture']['status']['long'],
+            season=game['league']['season'],
+            round=game['league']['round'],
+            home_goals_ht=game['score']['halftime']['home'],
+            away_goals_ht=game['score']['halftime']['away'],
+            home_goals_ft=game['score']['fulltime']['home'],
+            away_goals_ft=game['score']['fulltime']['away'],
+            home_goals_et=game['score']['extratime']['home'],
+            away_goals_et=game['score']['extratime']['away'],
+            home_goals_pen=game['score']['penalty']['home'],
+            away_goals_pen=game['score']['penalty']['away'],
+            pub_date=pub_date,
+            slug=slug,
+            payload_hash=hashes[game['fixture']['id']],
+        )
+
+        data_to_load[game['fixture']['id']] = Game(
+            **validated_game_data.__dict__,
+            home_team=home_team,
+            away_team=away_team,
+            tournament=tour,
+        )
+
+    return data_to_load
+
+
+def measure(name: str, func, *args, repeat: int = 3) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{name.ljust(20)} {best:.3f} s')
+
+    return best
+
+
+def main(fixtures_number: int = 10000) -> None:
+    updater = ScoresUpdater()
+    games = make_fixtures(fixtures_number, LEAGUES)
+    # Unsaved objects: the benchmark doesn't touch the DB.
+    tours = {
+        league_id: Tournament(id=uuid.uuid4(), api_tour_id=league_id, current_season=2022)
+        for league_id in LEAGUES
+    }
+    teams_objs = {
+        team['id']: Team(id=uuid.uuid4(), api_team_id=team['id'], name=team['name'])
+        for game in games
+        for team in game['teams'].values()
+    }
+    hashes = {game['fixture']['id']: updater.fingerprint(game) for game in games}
+
+    print(f'{fixtures_number} fixtures')
+    former = measure('pydantic + ORM', former_transform, games, tours, teams_objs, hashes)
+    rows = measure('GameRow', updater.make_rows, games, tours, teams_objs, hashes)
+    print(f'speedup              {former / rows:.1f}x')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,124 @@
+"""
+Load test of a scout run.
+
+Synthetic tournaments are added to the DB, then scout.scheduler.updaters
+runs against the local stand-in of the API (see benchmarks.mock_api).
+Requests per second, DB writes per second and the wall-clock time
+are reported for every run. Synthetic tournaments, their games and
+teams are deleted at the end (unless --keep).
+
+Use a scratch DB. Run from the app directory:
+python -m benchmarks.scout_load [--leagues 20] [--fixtures 2000] [--runs 2]
+
+"""
+
+import os
+import time
+from collections import Counter
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from arena.models import Team, Tournament
+from benchmarks.mock_api import (FIRST_LEAGUE_ID, SEASON, get_arguments,
+                                 make_mock, start_in_thread, stop_in_thread)
+from scout.cache import ResponseCache
+from scout.client import api_client
+from scout.scheduler import updaters
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'WITH')
+# DB writes: statements and rows.
+writes = Counter()
+
+
+def count_writes(execute, sql, params, many, context):
+    result = execute(sql, params, many, context)
+    statement = sql.lstrip()[:6].upper()
+    if statement in WRITE_STATEMENTS and (statement != 'WITH' or 'INSERT' in sql):
+        writes['statements'] += 1
+        writes['rows'] += max(context['cursor'].rowcount, 0)
+    return result
+
+
+def install_counter(connection, **kwargs) -> None:
+    if count_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_writes)
+
+
+def create_tours(leagues: int) -> None:
+    for api_tour_id in range(FIRST_LEAGUE_ID, FIRST_LEAGUE_ID + leagues):
+        Tournament.objects.update_or_create(
+            api_tour_id=api_tour_id,
+            defaults={
+                'pseudonym': f'Load {api_tour_id}',
+                'name': f'League {api_tour_id}',
+                'country': 'Country',
+                'current_season': SEASON,
+                'slug': f'load-{api_tour_id}',
+                'is_running': True,
+                'standings': None,
+                'standings_updated': None,
+                'scores_checked': None,
+            },
+        )
+
+
+def delete_tours(leagues: int) -> None:
+    # Games are deleted along with the tournaments.
+    Tournament.objects.filter(api_tour_id__gte=FIRST_LEAGUE_ID, api_tour_id__lt=FIRST_LEAGUE_ID + leagues).delete()
+    Team.objects.filter(api_team_id__gte=2 * 10 ** 9).delete()
+
+
+def report(run: int, wall_time: float, requests: Counter, db_writes: Counter) -> None:
+    print(f'Run {run}: {wall_time:.2f} s')
+    print(
+        f'  API: {requests["requests"]} requests, {requests["requests"] / wall_time:.1f} requests/s, '
+        f'{requests["429"]} x 429, {requests["bytes"] / 1024:.0f} KiB'
+    )
+    for key, value in sorted(requests.items()):
+        if key.startswith('requests:'):
+            print(f'    {key[9:]}: {value}')
+    print(
+        f'  DB: {db_writes["statements"]} write statements, {db_writes["rows"]} rows, '
+        f'{db_writes["rows"] / wall_time:.1f} rows/s'
+    )
+
+
+def main() -> None:
+    parser = get_arguments()
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--runs', type=int, default=2, help='Runs in a row: the first one fills the DB.')
+    parser.add_argument('--keep', action='store_true', help="Don't delete synthetic data at the end.")
+    arguments = parser.parse_args()
+
+    mock = make_mock(arguments)
+    loop, runner = start_in_thread(mock, port=arguments.port)
+    api_client.base_url = f'http://127.0.0.1:{arguments.port}/v3'
+    api_client.cache = ResponseCache(mode='off')
+    connection_created.connect(install_counter)
+    for connection in connections.all():
+        install_counter(connection)
+
+    create_tours(arguments.leagues)
+    print(f'{arguments.leagues} leagues, {arguments.fixtures} fixtures.')
+    try:
+        for run in range(1, arguments.runs + 1):
+            requests_before = Counter(mock.stats)
+            writes.clear()
+            start = time.perf_counter()
+            updaters()
+            wall_time = time.perf_counter() - start
+            report(run, wall_time, mock.stats - requests_before, Counter(writes))
+    finally:
+        stop_in_thread(loop, runner)
+        if not arguments.keep:
+            delete_tours(arguments.leagues)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Synthetic API data.
+
+Fixtures in the format of the API 'fixtures' endpoint,
+for benchmarks and load tests.
+
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+STATUSES = ('Match Finished', 'Not Started')
+
+
+def make_fixture(api_game_id: int, league_id: int, season: int, game_date: datetime, status: str) -> dict:
+    finished = status == 'Match Finished'
+    home_team_id = api_game_id * 2
+    away_team_id = api_game_id * 2 + 1
+
+    def goals() -> dict:
+        if not finished:
+            return {'home': None, 'away': None}
+        return {'home': random.randint(0, 4), 'away': random.randint(0, 4)}
+
+    fulltime = goals()
+    return {
+        'fixture': {
+            'id': api_game_id,
+            'referee': f'Referee {api_game_id % 50}',
+            'timezone': 'UTC',
+            'date': game_date.isoformat(),
+            'timestamp': int(game_date.timestamp()),
+            'venue': {'id': league_id, 'name': f'Stadium {home_team_id}', 'city': f'City {home_team_id}'},
+            'status': {
+                'long': status,
+                'short': 'FT' if finished else 'NS',
+                'elapsed': 90 if finished else None,
+            },
+        },
+        'league': {
+            'id': league_id,
+            'name': f'League {league_id}',
+            'country': 'Country',
+            'season': season,
+            'round': f'Regular Season - {api_game_id % 38 + 1}',
+        },
+        'teams': {
+            'home': {'id': home_team_id, 'name': f'Team {home_team_id}', 'winner': None},
+            'away': {'id': away_team_id, 'name': f'Team {away_team_id}', 'winner': None},
+        },
+        'goals': dict(fulltime),
+        'score': {
+            'halftime': goals(),
+            'fulltime': fulltime,
+            'extratime': {'home': None, 'away': None},
+            'penalty': {'home': None, 'away': None},
+        },
+    }
+
+
+def make_fixtures(
+        fixtures_number: int,
+        leagues: list,
+        season: int = 2022,
+        days: int = 7,
+        first_id: int = 100000) -> list:
+    # Fixtures, spread over the leagues and the range of +/- days from now.
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    fixtures = []
+    for i in range(fixtures_number):
+        game_date = now + timedelta(hours=random.randint(-days * 24, days * 24))
+        status = STATUSES[0] if game_date < now else STATUSES[1]
+        fixtures.append(make_fixture(first_id + i, leagues[i % len(leagues)], season, game_date, status))
+
+    return fixtures
+
+
+def make_events(fixture: dict) -> list:
+    # A goal for each goal of the score.
+    events = []
+    for side in ('home', 'away'):
+        team = fixture['teams'][side]
+        for goal in range(fixture['goals'][side] or 0):
+            events.append({
+                'time': {'elapsed': random.randint(1, 90), 'extra': None},
+                'team': {'id': team['id'], 'name': team['name'], 'logo': ''},
+                'player': {'id': team['id'] * 100 + goal, 'name': f'Player {goal}'},
+                'assist': {'id': None, 'name': None},
+                'type': 'Goal',
+                'detail': 'Normal Goal',
+                'comments': None,
+            })
+
+    return events
+
+
+def make_lineups(fixture: dict) -> list:
+    return [
+        {
+            'team': {'id': team['id'], 'name': team['name'], 'logo': ''},
+            'coach': {'id': team['id'], 'name': f'Coach {team["id"]}', 'photo': ''},
+            'formation': '4-4-2',
+            'startXI': [
+                {'player': {'id': team['id'] * 100 + number, 'name': f'Player {number}', 'number': number, 'pos': 'M'}}
+                for number in range(1, 12)
+            ],
+            'substitutes': [],
+        }
+        for team in fixture['teams'].values()
+    ]
+
+
+def make_statistics(fixture: dict) -> list:
+    possession = random.randint(30, 70)
+    return [
+        {
+            'team': {'id': team['id'], 'name': team['name'], 'logo': ''},
+            'statistics': [
+                {'type': 'Shots on Goal', 'value': random.randint(0, 10)},
+                {'type': 'Total Shots', 'value': random.randint(5, 25)},
+                {'type': 'Ball Possession', 'value': f'{team_possession}%'},
+                {'type': 'Corner Kicks', 'value': random.randint(0, 12)},
+            ],
+        }
+        for team, team_possession in zip(fixture['teams'].values(), (possession, 100 - possession))
+    ]
+
+
+def make_odds(fixture: dict, bookmakers: int = 10) -> list:
+    # Match Winner, Goals Over/Under and a market, that is not on the whitelist.
+    def price(base: float) -> str:
+        return f'{base * random.uniform(0.95, 1.05):.2f}'
+
+    return [{
+        'league': fixture['league'],
+        'fixture': {'id': fixture['fixture']['id'], 'date': fixture['fixture']['date']},
+        'update': fixture['fixture']['date'],
+        'bookmakers': [
+            {
+                'id': bookmaker,
+                'name': f'Bookmaker {bookmaker}',
+                'bets': [
+                    {'id': 1, 'name': 'Match Winner', 'values': [
+                        {'value': 'Home', 'odd': price(2.1)},
+                        {'value': 'Draw', 'odd': price(3.4)},
+                        {'value': 'Away', 'odd': price(3.6)},
+                    ]},
+                    {'id': 5, 'name': 'Goals Over/Under', 'values': [
+                        {'value': 'Over 2.5', 'odd': price(1.9)},
+                        {'value': 'Under 2.5', 'odd': price(1.9)},
+                    ]},
+                    {'id': 8, 'name': 'Both Teams Score', 'values': [
+                        {'value': 'Yes', 'odd': price(1.8)},
+                        {'value': 'No', 'odd': price(2.0)},
+                    ]},
+                ],
+            }
+            for bookmaker in range(1, bookmakers + 1)
+        ],
+    }]
+
+
+def make_standings(league_id: int, season: int, fixtures: list) -> list:
+    # One group with all teams of the league fixtures.
+    teams = {}
+    for fixture in fixtures:
+        for team in fixture['teams'].values():
+            teams[team['id']] = team
+
+    def stats() -> dict:
+        return {'played': 0, 'win': 0, 'draw': 0, 'lose': 0, 'goals': {'for': 0, 'against': 0}}
+
+    group = [
+        {
+            'rank': rank,
+            'team': {'id': team['id'], 'name': team['name'], 'logo': ''},
+            'points': 0,
+            'goalsDiff': 0,
+            'group': f'League {league_id}',
+            'form': '',
+            'status': 'same',
+            'description': 'Promotion' if rank == 1 else None,
+            'all': stats(),
+            'home': stats(),
+            'away': stats(),
+        }
+        for rank, team in enumerate(teams.values(), start=1)
+    ]
+    return [{'league': {'id': league_id, 'season': season, 'standings': [group]}}]
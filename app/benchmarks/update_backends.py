@@ -0,0 +1,142 @@
+"""
+Benchmark of the bulk update backends.
+
+Synthetic games get new preview data (eight JSON columns, as written by
+camp.preview.db_manager), which is written by each backend of
+arena.unit_of_work.UnitOfWork: Django bulk_update and COPY to a temporary table.
+The wall-clock time of a flush is reported for every number of rows.
+Synthetic tournament, its games and teams are deleted at the end.
+
+Use a scratch DB. Run from the app directory:
+python -m benchmarks.update_backends [--rows 1000 10000] [--rounds 3] [--last-games 5]
+
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from arena.models import Game, Team, Tournament
+from arena.unit_of_work import BACKENDS, UnitOfWork
+from benchmarks.mock_api import FIRST_LEAGUE_ID
+from benchmarks.scout_load import create_tours, delete_tours
+from benchmarks.synthetic import make_events, make_fixture, make_statistics
+
+# Ids of the synthetic games and teams, far from the ids of the real ones.
+FIRST_GAME_ID = 2 * 10 ** 9
+FIRST_TEAM_ID = 2 * 10 ** 9 + 10 ** 8
+# Fields of camp.preview.db_manager (not imported: it needs the ML dependencies).
+PREVIEW_FIELDS = ['prediction', 'preview', 'home_team_last_games', 'away_team_last_games',
+    'home_team_last_same_games', 'away_team_last_same_games',
+    'home_team_last_tour_games', 'away_team_last_tour_games']
+
+
+def create_games(rows: int) -> None:
+    tour = Tournament.objects.get(api_tour_id=FIRST_LEAGUE_ID)
+    home_team, away_team = (
+        Team.objects.update_or_create(
+            api_team_id=api_team_id,
+            defaults={'name': f'Team {api_team_id}', 'short_name': f'Team {api_team_id}'},
+        )[0]
+        for api_team_id in (FIRST_TEAM_ID, FIRST_TEAM_ID + 1)
+    )
+    now = datetime.now(timezone.utc)
+    Game.objects.bulk_create(
+        [
+            Game(
+                api_game_id=FIRST_GAME_ID + i,
+                game_date=now + timedelta(hours=i % 100),
+                status='Not Started',
+                tournament=tour,
+                round='Regular Season - 1',
+                home_team=home_team,
+                away_team=away_team,
+            )
+            for i in range(rows)
+        ],
+        batch_size=1000,
+    )
+
+
+def last_games(game: Game, number: int) -> dict:
+    # Last games of a team in the format of camp.preview.last_games.
+    now = datetime.now(timezone.utc)
+    games = []
+    for i in range(1, number + 1):
+        fixture = make_fixture(game.api_game_id, FIRST_LEAGUE_ID, 2022, now - timedelta(days=7 * i), 'Match Finished')
+        statistics = make_statistics(fixture)
+        games.append({
+            'game_date': fixture['fixture']['date'],
+            'home_team_short_name': fixture['teams']['home']['name'],
+            'away_team_short_name': fixture['teams']['away']['name'],
+            'home_goals_ft': fixture['goals']['home'],
+            'away_goals_ft': fixture['goals']['away'],
+            'game_odds': {'Home': [2.1, 2.05], 'Draw': [3.4, 3.3], 'Away': [3.6, 3.75]},
+            'home_team_stats': {item['type']: item['value'] for item in statistics[0]['statistics']},
+            'away_team_stats': {item['type']: item['value'] for item in statistics[1]['statistics']},
+            'game_events': [
+                {'time': event['time'], 'team': event['team']['id'], 'player': event['player'], 'type': event['type']}
+                for event in make_events(fixture)
+            ],
+        })
+    total_stats = {'Shots on Goal': random.randint(0, 50), 'Total Shots': random.randint(20, 150)}
+
+    return {'last_games': games, 'team_total_stats': total_stats, 'opponents_total_stats': total_stats}
+
+
+def set_preview(game: Game, games_number: int) -> None:
+    game.prediction = {'home_goals': round(random.uniform(0, 3), 2), 'away_goals': round(random.uniform(0, 3), 2)}
+    game.preview = {'text': ' '.join(['Preview of the game.'] * 100), 'created': str(datetime.now())}
+    for field in PREVIEW_FIELDS[2:]:
+        setattr(game, field, last_games(game, games_number))
+
+
+def run(backend: str, rows: int, games_number: int) -> float:
+    # Return the wall-clock time of the flush.
+    unit_of_work = UnitOfWork(Game, PREVIEW_FIELDS, backend=backend)
+    games = unit_of_work.track_all(
+        Game.objects.filter(api_game_id__gte=FIRST_GAME_ID, api_game_id__lt=FIRST_GAME_ID + rows),
+    )
+    for game in games:
+        set_preview(game, games_number)
+    start = time.perf_counter()
+    updated = unit_of_work.flush(games)
+    wall_time = time.perf_counter() - start
+    assert updated == rows, f'{updated} of {rows} rows are updated.'
+
+    return wall_time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark of the bulk update backends.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--rounds', type=int, default=3, help='Flushes of each backend, taken in turns.')
+    parser.add_argument('--last-games', type=int, default=5, help='Last games in each JSON column.')
+    arguments = parser.parse_args()
+
+    create_tours(1)
+    try:
+        create_games(max(arguments.rows))
+        for rows in arguments.rows:
+            times = {backend: [] for backend in BACKENDS}
+            for _ in range(arguments.rounds):
+                for backend in BACKENDS:
+                    times[backend].append(run(backend, rows, arguments.last_games))
+            for backend, backend_times in times.items():
+                print(
+                    f'{rows} rows, {backend}: best {min(backend_times):.2f} s, '
+                    f'mean {sum(backend_times) / len(backend_times):.2f} s'
+                )
+    finally:
+        delete_tours(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,19 +7,30 @@ Save previews in the database.
 
 """
 
-from django.db.models import F, QuerySet
+from django.db.models import F
 from pandas import DataFrame
 
 from arena.models import Game
+from arena.unit_of_work import UnitOfWork
 from camp.models import GameModel, TeamModel, TourModel
 from camp.preview.last_games import get_team_last_games
 from camp.preview_text_generator.text_manager import Preview
 
 
+# Game fields, that are set with a preview.
+PREVIEW_FIELDS = ['prediction', 'preview', 'home_team_last_games', 'away_team_last_games',
+    'home_team_last_same_games', 'away_team_last_same_games',
+    'home_team_last_tour_games', 'away_team_last_tour_games']
+
+
 class DataBaseManager:
 
-    def get_games_to_update(self, data_set: DataFrame) -> QuerySet:
-        return Game.objects.filter(
+    def __init__(self):
+        # Eight JSON columns per game: written through a temporary table.
+        self.unit_of_work = UnitOfWork(Game, PREVIEW_FIELDS, backend='copy')
+
+    def get_games_to_update(self, data_set: DataFrame) -> list:
+        games = Game.objects.filter(
             api_game_id__in=data_set['api_game_id'],
         ).annotate(
             home_team_name=F('home_team__name'),
@@ -27,9 +38,10 @@ class DataBaseManager:
             home_team_short_name=F('home_team__short_name'),
             away_team_short_name=F('away_team__short_name'),
         ).select_related('home_team', 'away_team', 'tournament')
+        return self.unit_of_work.track_all(games)
 
-    def prepare_data(self, games_to_update: QuerySet, predictions_dict: dict) -> None:
-        for game in games_to_update.iterator():
+    def prepare_data(self, games_to_update: list, predictions_dict: dict) -> None:
+        for game in games_to_update:
             game_data = GameModel(**game.__dict__)
             tour_data = TourModel(**game.tournament.__dict__)
             home_team_data = TeamModel(**game.home_team.__dict__)
@@ -71,11 +83,5 @@ class DataBaseManager:
             game.home_team_last_tour_games = home_team_last_tour_games
             game.away_team_last_tour_games = away_team_last_tour_games
 
-    def update_games(self, games_to_update: QuerySet) -> None:
-        Game.objects.bulk_update(
-            games_to_update,
-            ['prediction', 'preview', 'home_team_last_games', 'away_team_last_games',
-             'home_team_last_same_games', 'away_team_last_same_games',
-             'home_team_last_tour_games', 'away_team_last_tour_games'],
-            batch_size=100,
-        )
+    def update_games(self, games_to_update: list) -> None:
+        self.unit_of_work.flush(games_to_update)
@@ -12,8 +12,11 @@ from datetime import datetime, timedelta
 from django.db.models import QuerySet
 
 from arena.models import Game
+from arena.unit_of_work import UnitOfWork
 from camp.ratings.calculate_rating import RatingCalculator
 
+RATING_FIELDS = ['home_team_defence', 'home_team_attack', 'away_team_defence', 'away_team_attack']
+
 
 class GamesManager:
 
@@ -21,20 +24,24 @@ class GamesManager:
         now = datetime.now().astimezone()
         self.date_from = now - timedelta(days=1)
         self.date_to = now + timedelta(days=3)
+        self.unit_of_work = UnitOfWork(Game, RATING_FIELDS)
 
-    def get_future_games(self) -> QuerySet:
-        return Game.objects.filter(
+    def get_future_games(self) -> list:
+        games = Game.objects.filter(
             status='Not Started',
             game_date__lte=self.date_to,
         ).select_related('home_team', 'away_team', 'tournament')
+        # Ratings of all future games are recalculated by every run, only changed ones are written.
+        return self.unit_of_work.track_all(games)
 
     def get_finished_games(self) -> QuerySet:
+        # Ratings of a team are recalculated game by game.
         return Game.objects.filter(
             status='Match Finished',
             game_date__gte=self.date_from,
-        ).select_related('home_team', 'away_team', 'tournament')
+        ).select_related('home_team', 'away_team', 'tournament').order_by('game_date')
 
-    def prepare_data(self, future_games: QuerySet) -> None:
+    def prepare_data(self, future_games: list) -> None:
         for game in future_games:
             game.home_team_defence, game.home_team_attack = RatingCalculator.get_rating(
                 game.home_team,
@@ -47,9 +54,5 @@ class GamesManager:
                 game.game_date
             )
 
-    def update_games(self, future_games: QuerySet) -> None:
-        Game.objects.bulk_update(
-            future_games,
-            ['home_team_defence', 'home_team_attack', 'away_team_defence', 'away_team_attack'],
-            batch_size=100,
-        )
+    def update_games(self, future_games: list) -> None:
+        self.unit_of_work.flush(future_games)
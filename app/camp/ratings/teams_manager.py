@@ -8,16 +8,22 @@ Collect teams from the database to update ratings.
 from django.db.models import QuerySet
 
 from arena.models import Team
+from arena.unit_of_work import UnitOfWork
 from camp.ratings.calculate_rating import RatingCalculator
 
 
 class TeamsManager:
 
+    def __init__(self):
+        self.unit_of_work = UnitOfWork(Team, ['defence', 'attack', 'rating_updated'])
+
     def collect_teams(self, finished_games: QuerySet) -> list:
-        teams_to_update = []
+        # A team, that has played several games, is one tracked instance,
+        # so its ratings are recalculated from the ones of the previous game.
+        teams_to_update = {}
         for game in finished_games.iterator():
-            home_team = game.home_team
-            away_team = game.away_team
+            home_team = self.unit_of_work.track(game.home_team)
+            away_team = self.unit_of_work.track(game.away_team)
             # If team ratings were not updated yet.
             if home_team.rating_updated < game.game_date:
                 home_rating = {
@@ -46,13 +52,10 @@ class TeamsManager:
                     away_team.attack = new_ratings['away_attack']
                     away_team.rating_updated = game.game_date
 
-                    teams_to_update.extend([home_team, away_team])
+                    teams_to_update[home_team.pk] = home_team
+                    teams_to_update[away_team.pk] = away_team
 
-        return teams_to_update
+        return list(teams_to_update.values())
 
     def update_teams(self, teams_to_update: list) -> None:
-        Team.objects.bulk_update(
-            teams_to_update,
-            ['defence', 'attack', 'rating_updated'],
-            batch_size=100,
-        )
+        self.unit_of_work.flush(teams_to_update)
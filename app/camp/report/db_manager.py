@@ -7,9 +7,10 @@ Collect games from the database to update report.
 
 from datetime import datetime, timedelta
 
-from django.db.models import Q, QuerySet
+from django.db.models import Q
 
 from arena.models import Game
+from arena.unit_of_work import UnitOfWork
 from camp.models import TeamModel
 from camp.report_text_generator.text_manager import Report
 
@@ -19,9 +20,10 @@ class DataBaseManager:
     def __init__(self):
         now = datetime.now().astimezone()
         self.date_from = now - timedelta(days=3)
+        self.unit_of_work = UnitOfWork(Game, ['report'])
 
-    def get_games_to_update(self) -> QuerySet:
-        return Game.objects.filter(
+    def get_games_to_update(self) -> list:
+        games = Game.objects.filter(
             report__isnull=True,
             status='Match Finished',
             game_date__gte=self.date_from,
@@ -29,9 +31,10 @@ class DataBaseManager:
             Q(home_team_stats__isnull=True) |
             Q(away_team_stats__isnull=True)
         ).select_related('home_team', 'away_team')
+        return self.unit_of_work.track_all(games)
 
-    def prepare_data(self, games_to_update: QuerySet) -> None:
-        for game in games_to_update.iterator():
+    def prepare_data(self, games_to_update: list) -> None:
+        for game in games_to_update:
             home_team_data = TeamModel(**game.home_team.__dict__)
             away_team_data = TeamModel(**game.away_team.__dict__)
             home_team_stats = game.home_team_stats
@@ -44,9 +47,5 @@ class DataBaseManager:
             )
             game.report = report.create_report()
 
-    def update_games(self, games_to_update: QuerySet) -> None:
-        Game.objects.bulk_update(
-            games_to_update,
-            ['report'],
-            batch_size=100,
-        )
+    def update_games(self, games_to_update: list) -> None:
+        self.unit_of_work.flush(games_to_update)
@@ -1,8 +1,54 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
 from celery import Celery
+from redis import Redis
+from redis.exceptions import LockError
+from redis.lock import Lock
 
-from config.components.configs import CELERY_CONFIG
+from config.components.configs import CELERY_CONFIG, REDIS_CONFIG
 
 celery = Celery(backend=CELERY_CONFIG.backend, broker=CELERY_CONFIG.broker)
+redis = Redis(host=REDIS_CONFIG.host, port=REDIS_CONFIG.port)
+
+# The key is held while the live lane is running, so only one lane runs at a time.
+# It expires by itself, if a worker dies in the middle of the lane.
+LIVE_LOCK = 'scout:live-lane'
+LIVE_LOCK_TTL = 300
+# The same for the odds refresh, so two polls never append the same prices.
+# The lock holds a token of its run and is renewed, while the run goes on.
+ODDS_LOCK = 'scout:odds-lane'
+ODDS_LOCK_TTL = 600
+ODDS_LOCK_RENEWAL = 60
+
+
+@contextmanager
+def holding(lock: Lock, renewal: float) -> Iterator[None]:
+    # Renew the TTL of the acquired lock every renewal seconds, release it at the end.
+    stopped = threading.Event()
+
+    def renew():
+        while not stopped.wait(renewal):
+            try:
+                lock.reacquire()
+            except LockError:
+                # The lock has expired and might be taken by another run.
+                return
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+        try:
+            # Deleted only if the lock still holds the token of this run.
+            lock.release()
+        except LockError:
+            pass
+
 
 @celery.task
 def init_transfer():
@@ -13,6 +59,40 @@ def init_transfer():
     camp_updaters()
 
 
+@celery.task
+def refresh_odds():
+    from scout.scheduler import odds_updaters
+
+    # The token is not thread local: the lock is renewed from another thread.
+    lock = redis.lock(ODDS_LOCK, timeout=ODDS_LOCK_TTL, thread_local=False)
+    if not lock.acquire(blocking=False):
+        return
+    with holding(lock, ODDS_LOCK_RENEWAL):
+        odds_updaters()
+
+
+@celery.task
+def start_live_scores():
+    from scout.update_live import is_due
+
+    if is_due() and redis.set(LIVE_LOCK, 1, nx=True, ex=LIVE_LOCK_TTL):
+        live_scores.delay()
+
+
+@celery.task
+def live_scores():
+    from scout.scheduler import live_updaters
+    from scout.update_live import LIVE_POLL_INTERVAL
+
+    if live_updaters():
+        redis.expire(LIVE_LOCK, LIVE_LOCK_TTL)
+        live_scores.apply_async(countdown=LIVE_POLL_INTERVAL)
+    else:
+        redis.delete(LIVE_LOCK)
+
+
 @celery.on_after_configure.connect
 def setup_periodic_task(sender, **kwargs):
     sender.add_periodic_task(3600.0, init_transfer.s(), name='Update data every 60 minutes.')
+    sender.add_periodic_task(600.0, refresh_odds.s(), name='Refresh odds every 10 minutes.')
+    sender.add_periodic_task(300.0, start_live_scores.s(), name='Start live scores before kick-off.')
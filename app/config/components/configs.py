@@ -1,5 +1,13 @@
+from pathlib import Path
+from typing import List
+
+from dotenv import load_dotenv
 from pydantic import BaseSettings, Field
 
+# The API key may be kept in app/config/.env: it is loaded before the settings are read,
+# whichever module imports the settings first.
+load_dotenv(Path(__file__).resolve().parent.parent / '.env')
+
 
 class Settings(BaseSettings):
     class Config:
@@ -19,3 +27,37 @@ class CelerySettings(Settings):
     backend = f'redis://{REDIS_CONFIG.host}:{REDIS_CONFIG.port}/0'
 
 CELERY_CONFIG = CelerySettings()
+
+
+class APISettings(Settings):
+    key: str = Field(None, env='API_KEY')
+    host: str = Field('api-football-v1.p.rapidapi.com', env='API_HOST')
+    # Requests go to https://{host}/v3, unless another base URL is set (e.g. a local mock).
+    base_url: str = Field(None, env='API_BASE_URL')
+    connections_limit: int = Field(30, env='API_CONNECTIONS_LIMIT')
+    dns_cache_ttl: int = Field(300, env='API_DNS_CACHE_TTL')
+    keepalive_timeout: float = Field(30, env='API_KEEPALIVE_TIMEOUT')
+    request_timeout: float = Field(30, env='API_REQUEST_TIMEOUT')
+    # Retries of a request (429, 5xx, timeouts) and its deadline, including retries.
+    max_retries: int = Field(3, env='API_MAX_RETRIES')
+    backoff_base: float = Field(1, env='API_BACKOFF_BASE')
+    backoff_cap: float = Field(30, env='API_BACKOFF_CAP')
+    request_deadline: float = Field(90, env='API_REQUEST_DEADLINE')
+    # Failures in a row to stop requesting an endpoint and seconds to try it again.
+    breaker_threshold: int = Field(5, env='API_BREAKER_THRESHOLD')
+    breaker_reset_timeout: float = Field(60, env='API_BREAKER_RESET_TIMEOUT')
+    requests_per_minute: int = Field(300, env='API_REQUESTS_PER_MINUTE')
+    cache_mode: str = Field('on', env='API_CACHE_MODE')
+    cache_dir: str = Field(None, env='API_CACHE_DIR')
+    metrics_dir: str = Field(None, env='API_METRICS_DIR')
+
+API_CONFIG = APISettings()
+
+
+class OddsSettings(Settings):
+    # Ids of the bets and the bookmakers to keep, empty - keep all.
+    # Bets: 1 - Match Winner, 5 - Goals Over/Under.
+    bets: List[int] = Field([1, 5], env='ODDS_BETS')
+    bookmakers: List[int] = Field([], env='ODDS_BOOKMAKERS')
+
+ODDS_CONFIG = OddsSettings()
@@ -0,0 +1,168 @@
+"""
+API responses cache.
+
+Responses are stored on disk as JSON files, addressed by the hash
+of the request (endpoint and query parameters).
+
+Modes:
+- off: the cache is not used;
+- on: responses are served from the cache while they are fresh
+  (see CACHE_TTL), new responses are saved;
+- record: every response is taken from the API and saved;
+- replay: responses are served from the cache only, no network at all.
+
+In 'on' mode expired entries are deleted from disk by a periodic sweep.
+
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Union
+
+from config.components.configs import API_CONFIG
+
+CACHE_DIR = Path(__file__).resolve().parent / '.cache'
+CACHE_MODES = ('off', 'on', 'record', 'replay')
+
+# Time to live of cached responses in seconds, None - never expire.
+# Details are requested for finished games only, so they don't change:
+# fixtures by ids (fixtures?ids=) with embedded details, or the separate
+# endpoints of the standalone updaters (scout.update_events etc.).
+# Endpoints, that are not listed here, are not cached in 'on' mode.
+# Live games (fixtures?live=, or ids of the live lane) are kept apart from the rest of fixtures.
+# Odds are not cached: the odds lane requests a game only when its prices are due,
+# a cached response would be taken for unchanged prices.
+CACHE_TTL = {
+    'fixtures/ids': None,
+    'fixtures/events': None,
+    'fixtures/lineups': None,
+    'fixtures/statistics': None,
+    'fixtures': 5 * 60,
+    'standings': 30 * 60,
+}
+# Sections of fixtures by ids (see scout.update_details). A fixture with an empty
+# section means 'no data yet' as well, such responses are not cached.
+FIXTURE_SECTIONS = ('events', 'lineups', 'statistics')
+# Entries, that never expire, are deleted after this number of seconds:
+# details are requested for games of the last days only.
+CACHE_MAX_AGE = 7 * 24 * 60 * 60
+# The cache is swept not more often than once per this number of seconds.
+SWEEP_INTERVAL = 60 * 60
+
+
+class ResponseCache:
+
+    def __init__(
+            self,
+            mode: str = API_CONFIG.cache_mode,
+            directory: Union[str, Path] = API_CONFIG.cache_dir or CACHE_DIR,
+            ttl: dict = None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f'Unknown cache mode: {mode}.')
+        self.mode = mode
+        self.directory = Path(directory)
+        self.ttl = CACHE_TTL if ttl is None else ttl
+
+    @property
+    def offline(self) -> bool:
+        return self.mode == 'replay'
+
+    def key(self, url_tail: str, querystring: dict) -> str:
+        params = sorted((str(k), str(v)) for k, v in querystring.items())
+        request = json.dumps([url_tail, params])
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def ttl_key(self, url_tail: str, querystring: dict) -> str:
+        if 'live' in querystring:
+            return f'{url_tail}/live'
+        if 'ids' in querystring:
+            return f'{url_tail}/ids'
+        return url_tail
+
+    def path(self, key: str) -> Path:
+        return self.directory / key[:2] / f'{key}.json'
+
+    def get(self, url_tail: str, querystring: dict, ttl_key: str = None) -> Union[list, None]:
+        # Return the cached response or None, if there is no fresh one.
+        # The TTL key may be set by the caller, e.g. to keep live requests apart.
+        if self.mode not in ('on', 'replay'):
+            return None
+        ttl_key = ttl_key or self.ttl_key(url_tail, querystring)
+        if self.mode == 'on' and ttl_key not in self.ttl:
+            return None
+        try:
+            with open(self.path(self.key(url_tail, querystring))) as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        ttl = self.ttl.get(ttl_key)
+        if self.mode == 'on' and ttl is not None and time.time() - entry['stored'] > ttl:
+            return None
+
+        return entry['response']
+
+    def set(self, url_tail: str, querystring: dict, response: list, ttl_key: str = None) -> None:
+        if self.mode == 'off' or self.mode == 'replay':
+            return
+        # Empty (or incomplete, see is_complete) responses mean 'no data yet', they are not worth keeping.
+        ttl_key = ttl_key or self.ttl_key(url_tail, querystring)
+        if self.mode == 'on' and (ttl_key not in self.ttl or not is_complete(ttl_key, response)):
+            return
+        path = self.path(self.key(url_tail, querystring))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            'url_tail': url_tail,
+            'querystring': querystring,
+            'ttl_key': ttl_key,
+            'stored': time.time(),
+            'response': response,
+        }
+        # Write to a temporary file first, so a reader never gets a partial entry.
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, path)
+
+    def sweep(self) -> int:
+        # Delete expired entries, return the number of deleted ones.
+        # Recorded responses (record and replay modes) are kept.
+        if self.mode != 'on' or not self.directory.is_dir():
+            return 0
+        marker = self.directory / '.swept'
+        now = time.time()
+        try:
+            if now - marker.stat().st_mtime < SWEEP_INTERVAL:
+                return 0
+        except OSError:
+            pass
+        marker.touch()
+        deleted = 0
+        for path in self.directory.glob('*/*.json'):
+            try:
+                with open(path) as file:
+                    entry = json.load(file)
+                ttl_key = entry.get('ttl_key') or self.ttl_key(entry['url_tail'], entry['querystring'])
+                ttl = self.ttl.get(ttl_key, 0)
+                expired = now - entry['stored'] > (CACHE_MAX_AGE if ttl is None else ttl)
+            except (OSError, ValueError, KeyError):
+                # Broken entries are deleted as well.
+                expired = True
+            if expired:
+                try:
+                    os.remove(path)
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+
+        return deleted
+
+
+def is_complete(ttl_key: str, response: list) -> bool:
+    if not response:
+        return False
+    if ttl_key == 'fixtures/ids':
+        return all(fixture.get(section) for fixture in response for section in FIXTURE_SECTIONS)
+    return True
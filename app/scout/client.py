@@ -0,0 +1,224 @@
+"""
+Shared HTTP client for the API.
+
+One keep-alive session (and one event loop) is used by all parsers
+during a scout run, so connections and DNS lookups are reused
+between requests instead of being set up for every query.
+Failed requests are retried and reported as outcomes (see resilience).
+
+"""
+
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Any, Coroutine
+
+import aiohttp
+
+from config.components.configs import API_CONFIG
+from logs.logger import scout_logger as logger
+from scout.cache import ResponseCache
+from scout.metrics import metrics
+from scout.rate_limiter import QuotaExhausted, RateLimiter
+from scout.resilience import (API_ERROR, CACHE_MISS, CIRCUIT_OPEN,
+                              CONNECTION_ERROR, DEADLINE_EXCEEDED, HTTP_ERROR,
+                              OK, QUOTA_EXHAUSTED, RETRYABLE_HTTP_STATUSES,
+                              TIMEOUT, CircuitBreaker, Outcome, RetryPolicy,
+                              retry_after)
+
+
+class APIClient:
+
+    def __init__(
+            self,
+            host: str = API_CONFIG.host,
+            base_url: str = API_CONFIG.base_url,
+            api_key: str = API_CONFIG.key,
+            connections_limit: int = API_CONFIG.connections_limit,
+            dns_cache_ttl: int = API_CONFIG.dns_cache_ttl,
+            keepalive_timeout: float = API_CONFIG.keepalive_timeout,
+            request_timeout: float = API_CONFIG.request_timeout,
+            limiter: RateLimiter = None,
+            cache: ResponseCache = None,
+            retry_policy: RetryPolicy = None):
+        self.base_url = (base_url or f'https://{host}/v3').rstrip('/')
+        if not api_key:
+            logger.warning('API key is not set (API_KEY), requests go without it.')
+        # Headers without a value are left out: aiohttp can't send them.
+        self.headers = {
+            name: value for name, value in (('x-rapidapi-key', api_key), ('x-rapidapi-host', host))
+            if value is not None
+        }
+        self.connections_limit = connections_limit
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=request_timeout)
+        self.limiter = limiter or RateLimiter()
+        self.cache = cache or ResponseCache()
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Circuit breakers by endpoints.
+        self.breakers = defaultdict(CircuitBreaker)
+        self.loop = None
+        self.session = None
+
+    def run(self, coro: Coroutine) -> Any:
+        # Run a coroutine in the client's event loop. The loop lives
+        # until close() is called, so the session survives between calls.
+        if self.loop is None or self.loop.is_closed():
+            self.loop = asyncio.new_event_loop()
+        return self.loop.run_until_complete(coro)
+
+    def get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connections_limit,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+                ssl=False,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=self.timeout,
+            )
+        return self.session
+
+    @property
+    def quota(self) -> dict:
+        return self.limiter.remaining
+
+    async def fetch(self, url_tail: str, querystring: dict, ttl_key: str = None) -> Outcome:
+        # Return the outcome with the list of response items (all pages) as data.
+        # Failed outcomes carry the items, that have been received, if any.
+        cached = self.cache.get(url_tail, querystring, ttl_key)
+        if cached is not None:
+            return Outcome(OK, data=cached)
+        if self.cache.offline:
+            return Outcome(CACHE_MISS, data=[])
+        outcome = await self.request(url_tail, querystring)
+        if not outcome.ok:
+            return outcome._replace(data=[])
+        response = outcome.data.get('response') or []
+        # Get the rest of the pages of paginated endpoints.
+        pages_number = (outcome.data.get('paging') or {}).get('total', 1)
+        if 'page' not in querystring and isinstance(pages_number, int) and pages_number > 1:
+            pages = await asyncio.gather(*(
+                self.request(url_tail, {**querystring, 'page': page})
+                for page in range(2, pages_number + 1)
+            ))
+            for page in pages:
+                if not page.ok:
+                    # An incomplete response is not worth caching.
+                    return page._replace(data=response)
+                response.extend(page.data.get('response') or [])
+        self.cache.set(url_tail, querystring, response, ttl_key)
+
+        return outcome._replace(data=response)
+
+    async def request(self, url_tail: str, querystring: dict) -> Outcome:
+        # Request one page, return the outcome with the whole API data.
+        breaker = self.breakers[url_tail]
+        if breaker.allow():
+            outcome = await self.retry(url_tail, querystring)
+            breaker.record(outcome)
+        else:
+            outcome = Outcome(CIRCUIT_OPEN)
+        metrics.inc('scout_api_requests_total', endpoint=url_tail, status=outcome.status)
+        if not outcome.ok:
+            logger.warning(
+                '%s %s: %s after %s attempts (%s).',
+                url_tail, querystring, outcome.status, outcome.attempts, outcome.error or outcome.http_status,
+            )
+
+        return outcome
+
+    async def retry(self, url_tail: str, querystring: dict) -> Outcome:
+        # Send the request until it succeeds, fails for good,
+        # runs out of retries or its deadline.
+        policy = self.retry_policy
+        deadline = None
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await self.limiter.acquire()
+            except QuotaExhausted:
+                return Outcome(QUOTA_EXHAUSTED, attempts=attempt - 1)
+            # Waiting for the first token is pacing, not latency: the deadline starts after it.
+            if deadline is None:
+                deadline = time.monotonic() + policy.deadline
+            try:
+                outcome, retryable, wait = await asyncio.wait_for(
+                    self.send(url_tail, querystring, attempt),
+                    timeout=max(deadline - time.monotonic(), 0),
+                )
+            except asyncio.TimeoutError:
+                return Outcome(DEADLINE_EXCEEDED, attempts=attempt)
+            if not retryable or attempt > policy.max_retries:
+                return outcome
+            delay = policy.delay(attempt - 1, wait)
+            if time.monotonic() + delay >= deadline:
+                return outcome
+            await asyncio.sleep(delay)
+
+    async def send(self, url_tail: str, querystring: dict, attempt: int) -> tuple:
+        # One attempt: the outcome, whether it is worth retrying
+        # and the delay asked by the API (Retry-After).
+        start = time.perf_counter()
+        result = await self.attempt(url_tail, querystring, attempt)
+        outcome = result[0]
+        metrics.observe('scout_api_request_seconds', time.perf_counter() - start, endpoint=url_tail)
+        metrics.inc('scout_api_attempts_total', endpoint=url_tail, status=outcome.http_status or outcome.status)
+
+        return result
+
+    async def attempt(self, url_tail: str, querystring: dict, attempt: int) -> tuple:
+        session = self.get_session()
+        url = f'{self.base_url}/{url_tail}'
+        try:
+            async with session.get(url, params=querystring) as response:
+                self.limiter.update(response.headers)
+                if response.status in RETRYABLE_HTTP_STATUSES:
+                    outcome = Outcome(HTTP_ERROR, http_status=response.status, attempts=attempt)
+                    return outcome, True, retry_after(response.headers)
+                if response.status >= 400:
+                    return Outcome(HTTP_ERROR, http_status=response.status, attempts=attempt), False, None
+                body = await response.read()
+                metrics.inc('scout_api_received_bytes_total', len(body), endpoint=url_tail)
+                data = json.loads(body)
+        except asyncio.TimeoutError:
+            return Outcome(TIMEOUT, attempts=attempt), True, None
+        except aiohttp.ClientError as error:
+            return Outcome(CONNECTION_ERROR, attempts=attempt, error=repr(error)), True, None
+        except ValueError as error:
+            # Not a JSON body, e.g. an error page of a proxy.
+            return Outcome(HTTP_ERROR, http_status=response.status, attempts=attempt, error=repr(error)), True, None
+        if not isinstance(data, dict):
+            return Outcome(HTTP_ERROR, http_status=response.status, attempts=attempt, error='Unexpected body'), False, None
+        # The API reports some errors (wrong parameters, rate limit) in the body of a 200 response.
+        errors = data.get('errors')
+        if errors:
+            retryable = isinstance(errors, dict) and 'rateLimit' in errors
+            outcome = Outcome(API_ERROR, data=data, http_status=response.status, attempts=attempt, error=str(errors))
+            return outcome, retryable, None
+
+        return Outcome(OK, data=data, http_status=response.status, attempts=attempt), False, None
+
+    def close(self) -> None:
+        # Close the session and the event loop at the end of a scout run.
+        if self.loop is None or self.loop.is_closed():
+            return
+        if self.session is not None and not self.session.closed:
+            self.loop.run_until_complete(self.session.close())
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        self.loop.close()
+        self.session = None
+        self.loop = None
+        self.limiter.reset()
+        self.breakers.clear()
+        self.cache.sweep()
+
+
+# The client shared by all parsers.
+api_client = APIClient()
@@ -3,70 +3,157 @@ Custom bulk functions.
 
 Custom bulk get_or_create for Team model.
 Custom bulk update_or_creat for Game model.
+Custom bulk update of live scores for Game model.
+
+Both are single PostgreSQL statements per batch (INSERT ... ON CONFLICT),
+so existing rows are neither loaded nor diffed in Python.
 
 """
 
+import uuid
+
+from django.db import connection
+from django.db.models import Model
 from django.template.defaultfilters import slugify
+from django.utils import timezone
 
 from arena.models import Game, Team
+from scout.models import GameRow, LiveRow
 
+# Game fields to update, if a game already exists.
+GAME_FIELDS = ['game_date', 'venue', 'city', 'referee', 'status', 'tournament',
+    'season', 'round', 'home_team', 'away_team', 'home_goals_ht', 'away_goals_ht',
+    'home_goals_ft', 'away_goals_ft','home_goals_et','away_goals_et', 'home_goals_pen',
+    'away_goals_pen', 'slug', 'payload_hash']
 
-def team_bulk_get_or_create(teams: dict, batch_size=100) -> dict:
-    # 1. Get all existing teams (existing_teams) and put them into 'existing' dictionary.
-    # 2. Collect all new teams (not_existing).
-    # 3. Bulk create all new teams.
-    # 4. Return dictionary {team_api_id: team_object}.
-
-    existing_teams = Team.objects.filter(api_team_id__in=teams.keys())
-    existing = {}
-
-    for team in existing_teams:
-        existing[team.api_team_id] = team
-        teams.pop(team.api_team_id)
-
-    not_existing = {}
-    
-    for api_id, team in teams.items():
-        not_existing[api_id] = Team(
-            api_team_id=team.api_team_id,
-            name=team.name,
-            short_name=team.name,
-            slug=slugify('-'.join([str(team.api_team_id), team.name])),
-        )
 
-    Team.objects.bulk_create(not_existing.values(), batch_size)
+def insert_values(model: type[Model], objs: list) -> tuple:
+    # Columns, VALUES clause and params to insert objects of the model.
+    fields = model._meta.concrete_fields
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    row = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    values = ', '.join([row] * len(objs))
+    params = [
+        field.get_db_prep_save(field.pre_save(obj, add=True), connection)
+        for obj in objs
+        for field in fields
+    ]
+
+    return columns, values, params
+
 
-    objs = {**existing, **not_existing}
+def split(objs: list, batch_size: int) -> list:
+    return [objs[i:i + batch_size] for i in range(0, len(objs), batch_size)]
+
+
+def team_bulk_get_or_create(teams: dict, batch_size=100) -> dict:
+    # 1. Insert teams, that don't exist yet (ON CONFLICT DO NOTHING).
+    # 2. Select inserted and already existing teams in the same statement.
+    # 3. Return dictionary {team_api_id: team_object}, new teams are marked as created.
+
+    table = connection.ops.quote_name(Team._meta.db_table)
+    objs = {}
+
+    for batch in split(list(teams.values()), batch_size):
+        new_teams = [
+            Team(
+                api_team_id=team.api_team_id,
+                name=team.name,
+                short_name=team.name,
+                slug=slugify('-'.join([str(team.api_team_id), team.name])),
+            )
+            for team in batch
+        ]
+        columns, values, params = insert_values(Team, new_teams)
+        ids = ', '.join(['%s'] * len(batch))
+        sql = (
+            f'WITH inserted AS ('
+            f'INSERT INTO {table} ({columns}) VALUES {values} '
+            f'ON CONFLICT (api_team_id) DO NOTHING RETURNING *) '
+            f'SELECT *, TRUE AS created FROM inserted UNION ALL '
+            f'SELECT *, FALSE AS created FROM {table} WHERE api_team_id IN ({ids})'
+        )
+        params.extend(team.api_team_id for team in batch)
+        for team in Team.objects.raw(sql, params):
+            objs[team.api_team_id] = team
 
     return objs
 
 
-def game_bulk_update_or_create(games: dict, batch_size=100) -> None:
-    # 1. Get all existing games (existing_games).
-    # 2. Check if there is a new data for existing games (changed_games).
-    # 3. Update existing games and create new games.
+def game_bulk_update_or_create(games: dict, batch_size=100) -> tuple:
+    # 1. Insert new games.
+    # 2. Update existing games, only if there is a new data for them.
+    # 3. Update 'pub_date' only for games without preview.
+    # Games are GameRow tuples, their fields are the table columns.
+    # Return the numbers of created and updated games.
+
+    table = connection.ops.quote_name(Game._meta.db_table)
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(column) for column in ('id', *GameRow._fields, 'updated'))
+    row = '(' + ', '.join(['%s'] * (len(GameRow._fields) + 2)) + ')'
+    update_columns = [quote(Game._meta.get_field(f).column) for f in GAME_FIELDS]
+    assignments = ', '.join(f'{column} = EXCLUDED.{column}' for column in update_columns)
+    current = ', '.join(f'game.{column}' for column in update_columns)
+    excluded = ', '.join(f'EXCLUDED.{column}' for column in update_columns)
+    now = timezone.now()
+    created = updated = 0
+
+    for batch in split(list(games.values()), batch_size):
+        values = ', '.join([row] * len(batch))
+        params = []
+        for game in batch:
+            params.append(uuid.uuid4())
+            params.extend(game)
+            params.append(now)
+        sql = (
+            f'INSERT INTO {table} AS game ({columns}) VALUES {values} '
+            f'ON CONFLICT (api_game_id) DO UPDATE SET {assignments}, '
+            f'pub_date = CASE WHEN game.preview IS NULL THEN EXCLUDED.pub_date ELSE game.pub_date END, '
+            f'updated = EXCLUDED.updated '
+            f'WHERE ({current}) IS DISTINCT FROM ({excluded}) '
+            f'OR (game.preview IS NULL AND game.pub_date IS DISTINCT FROM EXCLUDED.pub_date) '
+            # xmax is 0 for an inserted row version.
+            f'RETURNING (game.xmax = 0)'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            for inserted, in cursor.fetchall():
+                if inserted:
+                    created += 1
+                else:
+                    updated += 1
+
+    return created, updated
+
+
+def live_bulk_update(rows: list, batch_size=100) -> int:
+    # Update statuses and scores of existing games, only if they have changed.
+    # Return the number of updated games.
+
+    table = connection.ops.quote_name(Game._meta.db_table)
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(column) for column in LiveRow._fields)
+    # Values of the first row define the types of the VALUES list.
+    types = ['integer', 'varchar'] + ['integer'] * (len(LiveRow._fields) - 2)
+    row = '(' + ', '.join(f'%s::{column_type}' for column_type in types) + ')'
+    score_columns = [quote(column) for column in LiveRow._fields[1:]]
+    assignments = ', '.join(f'{column} = live.{column}' for column in score_columns)
+    current = ', '.join(f'game.{column}' for column in score_columns)
+    new = ', '.join(f'live.{column}' for column in score_columns)
+    updated = 0
+
+    for batch in split(rows, batch_size):
+        values = ', '.join([row] * len(batch))
+        params = [timezone.now()]
+        params.extend(value for live_row in batch for value in live_row)
+        sql = (
+            f'UPDATE {table} AS game SET {assignments}, updated = %s '
+            f'FROM (VALUES {values}) AS live ({columns}) '
+            f'WHERE game.api_game_id = live.api_game_id '
+            f'AND ({current}) IS DISTINCT FROM ({new})'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            updated += cursor.rowcount
 
-    fields = ['game_date', 'venue', 'city', 'referee', 'status', 'tournament_id',
-    'season', 'round', 'home_team_id', 'away_team_id', 'home_goals_ht', 'away_goals_ht',
-    'home_goals_ft', 'away_goals_ft','home_goals_et','away_goals_et', 'home_goals_pen',
-    'away_goals_pen', 'pub_date', 'slug']
-
-    existing_games = Game.objects.filter(api_game_id__in=games.keys())
-    changed_games = []
-
-    for game in existing_games:
-        current_state = game.__dict__
-        new_state = games.pop(game.api_game_id).__dict__
-        changed = False
-        for f in fields:
-            if f == 'pub_date' and current_state['preview'] == None:
-                current_state[f] = new_state[f]
-                changed = True
-            elif f != 'pub_date' and current_state[f] != new_state[f]:
-                current_state[f] = new_state[f]
-                changed = True
-        if changed:
-            changed_games.append(game)
-
-    Game.objects.bulk_update(changed_games, fields, batch_size)
-    Game.objects.bulk_create(games.values(), batch_size)
+    return updated
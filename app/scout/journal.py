@@ -0,0 +1,84 @@
+"""
+Progress journal of a scout run.
+
+Details of every parsed batch are appended to a JSON lines file
+before they are written to the DB. If a run dies half-way,
+the next run takes the details from the journal instead of
+requesting them from the API once again.
+The journal is cleared, when the run is completed.
+NullJournal keeps nothing: for the details, that are stamped with
+the time of the update (odds), replayed data would pass for fresh.
+
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Union
+
+from logs.logger import scout_logger as logger
+
+JOURNAL_DIR = Path(__file__).resolve().parent / '.journal'
+# Details older than this number of seconds are not taken from the journal.
+JOURNAL_TTL = 60 * 60
+
+
+class Journal:
+
+    def __init__(self, name: str, directory: Union[str, Path] = JOURNAL_DIR, ttl: int = JOURNAL_TTL):
+        self.path = Path(directory) / f'{name.replace("/", "-")}.jsonl'
+        self.ttl = ttl
+
+    def load(self, api_game_ids: list) -> dict:
+        # Details {api_game_id: details} of the games, that have been parsed already.
+        api_game_ids = set(api_game_ids)
+        details = {}
+        try:
+            with open(self.path) as file:
+                lines = file.readlines()
+        except OSError:
+            return details
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The last line might be cut off by the crash.
+                continue
+            if time.time() - entry['stored'] > self.ttl:
+                continue
+            for api_game_id, game_details in entry['details'].items():
+                if int(api_game_id) in api_game_ids:
+                    details[int(api_game_id)] = game_details
+        if details:
+            logger.info('%s games are taken from the journal %s.', len(details), self.path.name)
+
+        return details
+
+    def append(self, details: dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as file:
+            file.write(json.dumps({'stored': time.time(), 'details': details}) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class NullJournal(Journal):
+
+    def __init__(self):
+        pass
+
+    def load(self, api_game_ids: list) -> dict:
+        return {}
+
+    def append(self, details: dict) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
@@ -0,0 +1,104 @@
+"""
+In-process lookups of teams and tournaments.
+
+Updaters of one scout run share the same teams and tournaments,
+so they are read from the DB once and kept by their API ids.
+Teams are loaded only on demand, never the whole table.
+Saved or deleted rows are dropped from the lookups (see receivers below).
+Updaters of a run work in several threads at once (the event loop thread
+and the details writer), so the dicts are read and updated under a lock.
+"""
+
+import threading
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from arena.models import Team, Tournament
+
+# Team fields, that are used by the updaters.
+TEAM_FIELDS = ('id', 'api_team_id', 'name', 'short_name', 'slug', 'logo')
+
+
+class Lookups:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        # Start from scratch, e.g. at the beginning of a scout run.
+        with self.lock:
+            self.tours = None
+            self.teams = {}
+            self.team_api_ids = {}
+
+    def get_running_tours(self) -> dict:
+        # Running tournaments {api_tour_id: tournament}.
+        with self.lock:
+            tours = self.tours
+        if tours is None:
+            tours = {tour.api_tour_id: tour for tour in Tournament.objects.filter(is_running=True)}
+            with self.lock:
+                self.tours = tours
+
+        return tours
+
+    def get_teams(self, api_team_ids: iter) -> dict:
+        # Teams {api_team_id: team}, only missing ones are read from the DB.
+        # The DB is read outside of the lock, so other threads don't wait for it.
+        api_team_ids = set(api_team_ids)
+        with self.lock:
+            missing = api_team_ids - self.teams.keys()
+        if missing:
+            self.add_teams({
+                team.api_team_id: team
+                for team in Team.objects.filter(api_team_id__in=missing).only(*TEAM_FIELDS)
+            })
+
+        with self.lock:
+            return {api_team_id: self.teams[api_team_id] for api_team_id in api_team_ids if api_team_id in self.teams}
+
+    def add_teams(self, teams: dict) -> None:
+        # Keep teams {api_team_id: team}, e.g. just created ones.
+        with self.lock:
+            self.teams.update(teams)
+            self.team_api_ids.update({team.id: api_team_id for api_team_id, team in teams.items()})
+
+    def get_team_api_ids(self, team_ids: iter) -> dict:
+        # API ids of teams {team_id: api_team_id}.
+        team_ids = set(team_ids)
+        with self.lock:
+            missing = team_ids - self.team_api_ids.keys()
+        if missing:
+            api_ids = dict(Team.objects.filter(id__in=missing).values_list('id', 'api_team_id'))
+            with self.lock:
+                self.team_api_ids.update(api_ids)
+
+        with self.lock:
+            return {team_id: self.team_api_ids[team_id] for team_id in team_ids if team_id in self.team_api_ids}
+
+    def drop_team(self, team: Team) -> None:
+        # The API id might have been changed, so the cached one is dropped as well.
+        with self.lock:
+            self.teams.pop(self.team_api_ids.pop(team.id, None), None)
+            self.teams.pop(team.api_team_id, None)
+
+    def drop_tours(self) -> None:
+        with self.lock:
+            self.tours = None
+
+
+lookups = Lookups()
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def drop_team(sender, instance, **kwargs):
+    lookups.drop_team(instance)
+
+
+@receiver(post_save, sender=Tournament)
+@receiver(post_delete, sender=Tournament)
+def drop_tours(sender, instance, **kwargs):
+    lookups.drop_tours()
@@ -0,0 +1,212 @@
+"""
+Metrics of a scout run.
+
+Counters, gauges and histograms with labels, collected by the API client,
+the updaters and the bulk writers. At the end of a run they are written as:
+- scout.prom: Prometheus text format (e.g. for the node exporter textfile collector),
+  rewritten by every run;
+- scout-<time>.json: summary of the run, only the last ones are kept.
+The odds and live lanes reset the metrics at the start of every run and
+write scout-<lane>.prom only, with the 'lane' label on every series.
+Histograms keep bucket counts, so their size doesn't grow with the requests.
+
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import accumulate
+from pathlib import Path
+from typing import Iterator, Union
+
+from config.components.configs import API_CONFIG
+
+METRICS_DIR = Path(__file__).resolve().parent / '.metrics'
+# Summaries of this number of the last runs are kept (a week of hourly runs).
+SUMMARIES_KEPT = 7 * 24
+# Upper bounds of the histograms buckets in seconds.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, float('inf'))
+
+HELP = {
+    'scout_api_requests_total': 'API requests by endpoint and outcome.',
+    'scout_api_attempts_total': 'HTTP attempts by endpoint and HTTP status.',
+    'scout_api_request_seconds': 'Latency of HTTP attempts by endpoint.',
+    'scout_api_received_bytes_total': 'Bytes received from the API by endpoint.',
+    'scout_api_quota_remaining': 'Remaining API quota, as reported by the API.',
+    'scout_rows_validated_total': 'API items converted to DB rows by updater.',
+    'scout_rows_created_total': 'DB rows created by updater.',
+    'scout_rows_updated_total': 'DB rows updated by updater.',
+    'scout_stage_seconds': 'Duration of the stages of the last run.',
+    'scout_run_timestamp_seconds': 'End time of the last run.',
+}
+
+
+class Metrics:
+
+    def __init__(self):
+        # Updaters run in threads (DB work) and in the event loop.
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        # {name: {labels: value}}, labels - sorted tuple of (label, value) strings.
+        self.counters = defaultdict(lambda: defaultdict(float))
+        self.gauges = defaultdict(dict)
+        # {name: {labels: {'buckets': [count per bucket], 'count', 'sum', 'max'}}}
+        self.histograms = defaultdict(lambda: defaultdict(new_histogram))
+        self.started = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        with self.lock:
+            self.counters[name][labels_tuple(labels)] += value
+
+    def set(self, name: str, value: Union[float, None], **labels) -> None:
+        if value is None:
+            return
+        with self.lock:
+            self.gauges[name][labels_tuple(labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        with self.lock:
+            histogram = self.histograms[name][labels_tuple(labels)]
+            histogram['buckets'][bisect_left(LATENCY_BUCKETS, value)] += 1
+            histogram['count'] += 1
+            histogram['sum'] += value
+            histogram['max'] = max(histogram['max'], value)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.set('scout_stage_seconds', time.perf_counter() - start, stage=name)
+
+    def to_prometheus(self, lane: str = None) -> str:
+        # Series of a lane are labelled, so they don't clash with the series of the main run.
+        extra = (('lane', lane),) if lane else ()
+        lines = []
+        with self.lock:
+            for kind, metrics in (('counter', self.counters), ('gauge', self.gauges)):
+                for name, values in sorted(metrics.items()):
+                    lines.extend(header(name, kind))
+                    for labels, value in sorted(values.items()):
+                        lines.append(f'{name}{format_labels(labels + extra)} {float(value)}')
+            for name, values in sorted(self.histograms.items()):
+                lines.extend(header(name, 'histogram'))
+                for labels, histogram in sorted(values.items()):
+                    labels += extra
+                    for bound, count in zip(LATENCY_BUCKETS, accumulate(histogram['buckets'])):
+                        le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                        lines.append(f'{name}_bucket{format_labels(labels + (("le", le),))} {count}')
+                    lines.append(f'{name}_sum{format_labels(labels)} {float(histogram["sum"])}')
+                    lines.append(f'{name}_count{format_labels(labels)} {histogram["count"]}')
+
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {
+                'started': datetime.fromtimestamp(self.started).astimezone().isoformat(),
+                'duration': round(time.time() - self.started, 3),
+                'counters': {
+                    name: {label_key(labels) or 'total': value for labels, value in values.items()}
+                    for name, values in self.counters.items()
+                },
+                'gauges': {
+                    name: {label_key(labels) or 'value': value for labels, value in values.items()}
+                    for name, values in self.gauges.items()
+                },
+                'histograms': {
+                    name: {
+                        label_key(labels) or 'all': describe(histogram)
+                        for labels, histogram in values.items()
+                    }
+                    for name, values in self.histograms.items()
+                },
+            }
+
+    def write(self, directory: Union[str, Path] = API_CONFIG.metrics_dir or METRICS_DIR, lane: str = None) -> Path:
+        # Write both files of the run, return the path of the summary.
+        # A lane writes only its Prometheus file, which path is returned.
+        self.set('scout_run_timestamp_seconds', time.time())
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        if lane:
+            prom_path = directory / f'scout-{lane}.prom'
+            write_atomic(prom_path, self.to_prometheus(lane))
+            return prom_path
+        write_atomic(directory / 'scout.prom', self.to_prometheus())
+        summary_path = directory / f'scout-{datetime.fromtimestamp(self.started):%Y%m%d-%H%M%S}.json'
+        write_atomic(summary_path, json.dumps(self.summary(), indent=2))
+        prune_summaries(directory)
+
+        return summary_path
+
+
+def header(name: str, kind: str) -> list:
+    return [f'# HELP {name} {HELP.get(name, name)}', f'# TYPE {name} {kind}']
+
+
+def labels_tuple(labels: dict) -> tuple:
+    return tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{label}="{value}"' for (label, _), value in zip(labels, escaped)) + '}'
+
+
+def label_key(labels: tuple) -> str:
+    return ','.join(f'{label}={value}' for label, value in labels)
+
+
+def new_histogram() -> dict:
+    return {'buckets': [0] * len(LATENCY_BUCKETS), 'count': 0, 'sum': 0.0, 'max': 0.0}
+
+
+def quantile(histogram: dict, q: float) -> float:
+    # Upper bound of the bucket, that holds the quantile, but not above the maximum.
+    rank = q * histogram['count']
+    for bound, count in zip(LATENCY_BUCKETS, accumulate(histogram['buckets'])):
+        if count >= rank:
+            return min(bound, histogram['max'])
+    return histogram['max']
+
+
+def describe(histogram: dict) -> dict:
+    return {
+        'count': histogram['count'],
+        'sum': round(histogram['sum'], 3),
+        'p50': round(quantile(histogram, 0.5), 3),
+        'p95': round(quantile(histogram, 0.95), 3),
+        'max': round(histogram['max'], 3),
+    }
+
+
+def prune_summaries(directory: Path, kept: int = SUMMARIES_KEPT) -> None:
+    # Names hold the start time of the run, so they sort from the oldest one.
+    for path in sorted(directory.glob('scout-*.json'))[:-kept]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def write_atomic(path: Path, text: str) -> None:
+    # A collector never reads a partial file.
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+# Metrics of the current scout run.
+metrics = Metrics()
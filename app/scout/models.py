@@ -4,25 +4,47 @@ Models to validate data from the API.
 """
 
 from datetime import datetime
-from typing import Union
+from typing import NamedTuple, Union
 
 from pydantic import BaseModel
 
+# Statuses of games in play.
+LIVE_STATUSES = (
+    'First Half',
+    'Halftime',
+    'Second Half',
+    'Extra Time',
+    'Break Time',
+    'Penalty In Progress',
+    'Match Suspended',
+    'Match Interrupted',
+)
+# Games in play, that aren't stopped: suspended or interrupted games
+# can stay so for hours or days.
+IN_PLAY_STATUSES = tuple(
+    status for status in LIVE_STATUSES if status not in ('Match Suspended', 'Match Interrupted')
+)
+
 
 class TeamModel(BaseModel):
     api_team_id: int
     name: str
 
 
-class GameModel(BaseModel):
+class GameRow(NamedTuple):
+    # Compact (tuple-based) game row, written to the DB as it is.
+    # Field names are the columns of the game table.
     api_game_id: int
     game_date: datetime
     venue: Union[str, None]
     city: Union[str, None]
     referee: Union[str, None]
     status: str
+    tournament_id: object
     season: int
     round: Union[str, None]
+    home_team_id: object
+    away_team_id: object
     home_goals_ht: Union[int, None]
     away_goals_ht: Union[int, None]
     home_goals_ft: Union[int, None]
@@ -33,3 +55,47 @@ class GameModel(BaseModel):
     away_goals_pen: Union[int, None]
     pub_date: Union[datetime, None]
     slug: str
+    payload_hash: str
+
+
+class LiveRow(NamedTuple):
+    # Status and scores of a game in play.
+    api_game_id: int
+    status: str
+    home_goals_ht: Union[int, None]
+    away_goals_ht: Union[int, None]
+    home_goals_ft: Union[int, None]
+    away_goals_ft: Union[int, None]
+    home_goals_et: Union[int, None]
+    away_goals_et: Union[int, None]
+    home_goals_pen: Union[int, None]
+    away_goals_pen: Union[int, None]
+
+
+def goals_ft(game: dict, side: str) -> Union[int, None]:
+    # While a game is in play, its current score is kept as the full-time one.
+    if game['fixture']['status']['long'] in LIVE_STATUSES:
+        return to_int_or_none(game['goals'][side])
+    return to_int_or_none(game['score']['fulltime'][side])
+
+
+def to_int(value) -> int:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return int(value)
+
+
+def to_int_or_none(value) -> Union[int, None]:
+    return None if value is None else to_int(value)
+
+
+def to_str(value) -> str:
+    if isinstance(value, str):
+        return value
+    if value is None:
+        raise ValueError('None is not a valid string')
+    return str(value)
+
+
+def to_str_or_none(value) -> Union[str, None]:
+    return None if value is None else to_str(value)
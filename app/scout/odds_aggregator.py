@@ -0,0 +1,110 @@
+"""
+Odds aggregator.
+
+Convert odds of a batch of games from all bookmakers into one array
+(game x market x selection x bookmaker) and aggregate the prices
+of the bookmakers in one vectorized pass.
+
+"""
+
+import numpy as np
+
+AGGREGATIONS = ('mean', 'median', 'trimmed_mean', 'best')
+# Share of the lowest and the highest prices, that are cut off for the trimmed mean.
+TRIM = 0.1
+
+
+class OddsAggregator:
+
+    def __init__(self, method: str = 'mean', trim: float = TRIM, bets: list = None, bookmakers: list = None):
+        if method not in AGGREGATIONS:
+            raise ValueError(f'Unknown aggregation: {method}.')
+        self.method = method
+        self.trim = trim
+        # Ids of the bets and the bookmakers to keep, None or empty - keep all.
+        self.bets = set(bets or [])
+        self.bookmakers = set(bookmakers or [])
+
+    def build(self, games_odds: dict) -> tuple:
+        # Get odds from Api as the next structure:
+        # game -> bookie -> bet type (e.g. 'Match Winner') ->
+        # bet value (e.g. 'Home') -> odds value (e.g. '2.20').
+        # Return the array of prices (NaN for missing ones) and the indexes.
+        game_ids = list(games_odds.keys())
+        markets = {}
+        selections = {}
+        bookies = {}
+        coords = []
+        prices = []
+        for g, data in enumerate(games_odds.values()):
+            for bookie in data[0]['bookmakers'] if data else []:
+                if self.bookmakers and bookie['id'] not in self.bookmakers:
+                    continue
+                b = bookies.setdefault(bookie['id'], len(bookies))
+                for bet in bookie['bets']:
+                    if self.bets and bet['id'] not in self.bets:
+                        continue
+                    m = markets.setdefault(bet['name'], len(markets))
+                    market_selections = selections.setdefault(bet['name'], {})
+                    for value in bet['values']:
+                        if 'odd' in value:
+                            s = market_selections.setdefault(value['value'], len(market_selections))
+                            coords.append((g, m, s, b))
+                            prices.append(value['odd'])
+
+        shape = (
+            len(game_ids),
+            len(markets),
+            max((len(item) for item in selections.values()), default=0),
+            len(bookies),
+        )
+        array = np.full(shape, np.nan)
+        if coords:
+            g, m, s, b = np.array(coords).T
+            array[g, m, s, b] = np.array(prices, dtype=float)
+
+        return array, game_ids, markets, selections
+
+    def calculate(self, array: np.ndarray) -> dict:
+        # All the aggregations along the bookmakers axis.
+        # Sorting puts NaN to the end, so the first 'count' prices are real ones.
+        count = np.sum(~np.isnan(array), axis=-1)
+        valid = np.maximum(count, 1)
+        ordered = np.sort(array, axis=-1)
+        filled = np.nan_to_num(ordered)
+        position = np.arange(array.shape[-1])
+
+        cut = np.floor(count * self.trim).astype(int)
+        kept = (position >= cut[..., None]) & (position < (count - cut)[..., None])
+        lower_middle = take_along(filled, ((count - 1) // 2).clip(0))
+        upper_middle = take_along(filled, count // 2)
+
+        return {
+            'count': count,
+            'mean': filled.sum(axis=-1) / valid,
+            'median': (lower_middle + upper_middle) / 2,
+            'trimmed_mean': np.where(kept, filled, 0).sum(axis=-1) / np.maximum(count - 2 * cut, 1),
+            'best': take_along(filled, (count - 1).clip(0)),
+        }
+
+    def aggregate(self, games_odds: dict) -> dict:
+        # Return the next structure:
+        # game -> bet type -> bet value -> aggregated odds value.
+        array, game_ids, markets, selections = self.build(games_odds)
+        aggregated = {api_game_id: {} for api_game_id in game_ids}
+        if array.size == 0:
+            return aggregated
+        results = self.calculate(array)
+        values = np.round(results[self.method], 2)
+        count = results['count']
+        for market, m in markets.items():
+            for selection, s in selections[market].items():
+                for g in np.flatnonzero(count[:, m, s]):
+                    aggregated[game_ids[g]].setdefault(market, {})[selection] = float(values[g, m, s])
+
+        return aggregated
+
+
+def take_along(array: np.ndarray, index: np.ndarray) -> np.ndarray:
+    # Take one element along the last axis for each position of the index.
+    return np.take_along_axis(array, index[..., None], axis=-1)[..., 0]
@@ -4,48 +4,35 @@ Parsers for updating process.
 """
 
 import asyncio
-import os
-import time
 from abc import ABC, abstractmethod
-from datetime import date, datetime, timedelta
-from pathlib import Path
-from typing import Any, Generator, Iterator, Union
+from datetime import date, timedelta
+from typing import Any, AsyncIterator, Generator, Iterator, Union
 
-import aiohttp
-from aiohttp import ClientConnectorError
 from django.db.models import QuerySet
-from dotenv import load_dotenv
 
-path = Path(__file__).resolve().parent.parent
-load_dotenv(''.join([str(path), '/config/.env']))
+from scout.client import APIClient, api_client
+from scout.resilience import Outcome
 
 # The range for which scores should be parsed.
 SCORES_DELTA_BOTTOM = 7
 SCORES_DELTA_TOP = 7
+# The maximum number of games, that can be requested from 'fixtures' at once.
+FIXTURES_IDS_LIMIT = 20
 
 
 class Parser(ABC):
 
-    def __init__(self, url_tail: str):
+    def __init__(self, url_tail: str, client: APIClient = api_client, params: dict = None):
         self.url_tail = url_tail
+        self.client = client
+        # Query parameters to add to every request.
+        self.params = params or {}
+        # Ids of the games or tournaments, which requests have failed during the last parsing:
+        # they have no data because of the failure, not because the API has none.
+        self.failed = set()
 
-    async def api_parser(self, querystring: dict) -> list:
-        async with aiohttp.ClientSession() as session:
-            url = f'https://api-football-v1.p.rapidapi.com/v3/{self.url_tail}'
-            headers = {
-                'x-rapidapi-key': os.environ.get('API_KEY'),
-                'x-rapidapi-host': 'api-football-v1.p.rapidapi.com',
-            }
-            try:
-                async with session.get(url, headers=headers, params=querystring, ssl=False) as response:
-                    data = await response.json()
-                    try:
-                        return data['response']
-                    except KeyError:
-                        return []
-            except ClientConnectorError:
-                return []
-
+    async def api_parser(self, querystring: dict, ttl_key: str = None) -> Outcome:
+        return await self.client.fetch(self.url_tail, querystring, ttl_key)
 
     @abstractmethod
     def get_data(self, what_to_parse: Union[QuerySet, dict]) -> Union[dict, list, iter]:
@@ -57,6 +44,8 @@ class Parser(ABC):
 
 
 class DetailsParser(Parser):
+    # Games with empty responses are left out of the parsed data by default.
+    keep_empty = False
 
     def split_games(self, games_to_parse: QuerySet, batch_size: int = 100) -> Generator:
         # Split games into batches.
@@ -64,65 +53,169 @@ class DetailsParser(Parser):
             yield games_to_parse[i:i + batch_size]
 
     def get_data(self, games_to_parse: QuerySet) -> dict:
+        return self.client.run(self.collect(games_to_parse))
+
+    async def collect(self, games_to_parse: QuerySet) -> dict:
         game_details = {}
-        batched_games = self.split_games(games_to_parse)
-        batch_counter = 0
-        for batch in batched_games:
-            batch_counter += 1
-            if batch_counter > 3:
-                # The API has limitations on the number of requests per minute.
-                time.sleep(90)
-                batch_counter = 0
-            game_details.update(asyncio.run(self.tasker(batch)))
+        async for batch_details in self.batches(games_to_parse):
+            game_details.update(batch_details)
 
         return game_details
 
+    async def batches(self, games_to_parse: QuerySet) -> AsyncIterator[dict]:
+        # Yield details batch by batch, as soon as each batch is parsed.
+        # Requests are paced by the client's rate limiter,
+        # according to the quota left.
+        self.failed = set()
+        for batch in self.split_games(games_to_parse):
+            yield await self.tasker(batch)
+
     async def tasker(self, batch: list) -> dict:
         batch_data = {}
         tasks = {}
         for api_game_id in batch:
-            querystring = {'fixture': api_game_id}
+            querystring = {**self.params, 'fixture': api_game_id}
             tasks[api_game_id] = asyncio.create_task(
                 self.api_parser(querystring=querystring),
             )
         for game_id, task in tasks.items():
-            response = await task
-            if len(response) > 0:
-                batch_data[game_id] = response
+            outcome = await task
+            if not outcome.ok:
+                self.failed.add(game_id)
+            elif len(outcome.data) > 0 or self.keep_empty:
+                batch_data[game_id] = outcome.data
 
         return batch_data
 
 
+class FixturesDetailsParser(DetailsParser):
+    # Request details for several games at once (fixtures?ids=),
+    # events, lineups and statistics are embedded in each fixture.
+
+    async def tasker(self, batch: list) -> dict:
+        tasks = {}
+        for ids in self.split_games(batch, FIXTURES_IDS_LIMIT):
+            querystring = {'ids': '-'.join(str(api_game_id) for api_game_id in ids)}
+            tasks[tuple(ids)] = asyncio.create_task(
+                self.api_parser(querystring=querystring),
+            )
+        batch_data = {}
+        for ids, task in tasks.items():
+            outcome = await task
+            if not outcome.ok:
+                self.failed.update(ids)
+            for fixture in outcome.data:
+                batch_data[fixture['fixture']['id']] = fixture
+
+        return batch_data
+
+
+class OddsParser(DetailsParser):
+    # Games without odds are kept: they are marked as checked.
+    keep_empty = True
+
+
 class ScoresParser(Parser):
 
     def get_data(self, tours_to_parse: dict) -> list:
         # API data (last and future games).
-        return asyncio.run(self.tasker(tours_to_parse))
+        return self.client.run(self.tasker(tours_to_parse))
+
+    def get_dates(self) -> list:
+        # Dates of the range for which scores should be parsed.
+        today = date.today()
+        return [
+            str(today + timedelta(days=delta))
+            for delta in range(-SCORES_DELTA_BOTTOM, SCORES_DELTA_TOP + 1)
+        ]
 
     async def tasker(self, tours: dict) -> list:
+        # Choose the way to get games, that takes fewer requests:
+        # one request per tournament or one request per date.
+        self.failed = set()
+        dates = self.get_dates()
+        if len(dates) < len(tours):
+            return await self.dates_tasker(tours, dates)
+
+        return await self.tours_tasker(tours, dates[0], dates[-1])
+
+    async def tours_tasker(self, tours: dict, date_from: str, date_to: str) -> list:
         # Create a task for each tournament and make a request
         # to the Api to get latest and next games (date_from, date_to).
-        tasks = []
-        today = date.today()
-        date_from = str((today - timedelta(days=SCORES_DELTA_BOTTOM)))
-        date_to = str((today + timedelta(days=SCORES_DELTA_TOP)))
-        for tour in tours.values():
+        tasks = {}
+        for api_tour_id, tour in tours.items():
             querystring = {
                 'league': tour.api_tour_id,
                 'season': tour.current_season,
                 'from': date_from,
                 'to': date_to,
             }
+            tasks[api_tour_id] = asyncio.create_task(
+                self.api_parser(querystring=querystring),
+            )
+        games = []
+        for api_tour_id, task in tasks.items():
+            outcome = await task
+            if not outcome.ok:
+                self.failed.add(api_tour_id)
+            games.extend(outcome.data)
+
+        return games
+
+    async def dates_tasker(self, tours: dict, dates: list) -> list:
+        # Create a task for each date to get games of all leagues,
+        # then keep only games of the running tournaments.
+        tasks = []
+        for game_date in dates:
             tasks.append(
                 asyncio.create_task(
-                    self.api_parser(querystring=querystring),
+                    self.api_parser(querystring={'date': game_date}),
                 ),
             )
         games = []
         for task in tasks:
-            response = await task
-            if len(response) > 0:
-                games.extend(response)
+            outcome = await task
+            if not outcome.ok:
+                # Every date has games of all the tournaments.
+                self.failed = set(tours)
+            for game in outcome.data:
+                tour = tours.get(game['league']['id'])
+                if tour is not None and game['league']['season'] == tour.current_season:
+                    games.append(game)
+
+        return games
+
+
+class LiveParser(Parser):
+    # All games in play are returned by one request (fixtures?live=all).
+
+    def get_data(self, tours_to_parse: dict) -> list:
+        return self.client.run(self.tasker(tours_to_parse))
+
+    async def tasker(self, tours: dict, live_ids: set = frozenset()) -> list:
+        # Keep only games of the running tournaments.
+        # Games, that were live, but are not in play anymore, are requested by ids
+        # to get their final scores (not cached, unlike ids requests of the details).
+        outcome = await self.api_parser(querystring={'live': 'all'})
+        if not outcome.ok:
+            # Games, that are not in the response, are not taken for ended.
+            return []
+        games = [
+            game for game in outcome.data
+            if game['league']['id'] in tours
+            and game['league']['season'] == tours[game['league']['id']].current_season
+        ]
+        ended_ids = sorted(live_ids - {game['fixture']['id'] for game in games})
+        tasks = []
+        for i in range(0, len(ended_ids), FIXTURES_IDS_LIMIT):
+            querystring = {'ids': '-'.join(str(api_game_id) for api_game_id in ended_ids[i:i + FIXTURES_IDS_LIMIT])}
+            tasks.append(
+                asyncio.create_task(
+                    self.api_parser(querystring=querystring, ttl_key=f'{self.url_tail}/live'),
+                ),
+            )
+        for task in tasks:
+            games.extend((await task).data)
 
         return games
 
@@ -130,24 +223,25 @@ class ScoresParser(Parser):
 class StandingsParser(Parser):
 
     def get_data(self, tours_to_parse: dict) -> iter:
-        return asyncio.run(self.tasker(tours_to_parse))
+        return self.client.run(self.tasker(tours_to_parse))
 
     async def tasker(self, tours: dict) -> Iterator[Any]:
-        tasks = []
-        for tour in tours.values():
+        self.failed = set()
+        tasks = {}
+        for api_tour_id, tour in tours.items():
             querystring = {
                 'league': tour.api_tour_id,
                 'season': tour.current_season,
             }
-            tasks.append(
-                asyncio.create_task(
-                    self.api_parser(querystring=querystring),
-                ),
+            tasks[api_tour_id] = asyncio.create_task(
+                self.api_parser(querystring=querystring),
             )
         standings = []
-        for task in tasks:
-            response = await task
-            if len(response) > 0 and 'league' in response[0]:
-                standings.append(response[0]['league'])
+        for api_tour_id, task in tasks.items():
+            outcome = await task
+            if not outcome.ok:
+                self.failed.add(api_tour_id)
+            elif len(outcome.data) > 0 and 'league' in outcome.data[0]:
+                standings.append(outcome.data[0]['league'])
 
         return iter(standings)
@@ -0,0 +1,62 @@
+"""
+Implied probabilities.
+
+Remove the bookmaker margin (overround) from the odds of a market.
+Odds are given as an array: one row per game, one column per outcome.
+Rows with a missing price (NaN) get NaN probabilities.
+
+"""
+
+import numpy as np
+
+# Number of solver iterations (both methods converge much faster).
+ITERATIONS = 50
+
+
+def power_probabilities(odds: np.ndarray) -> np.ndarray:
+    # Power method: p = (1 / odds) ^ k, where k is such that sum(p) = 1.
+    # Solved with Newton's method for all the rows at once.
+    implied = 1 / odds
+    log_implied = np.log(implied)
+    k = np.ones((odds.shape[0], 1))
+    for _ in range(ITERATIONS):
+        powered = implied ** k
+        excess = powered.sum(axis=1, keepdims=True) - 1
+        slope = (powered * log_implied).sum(axis=1, keepdims=True)
+        k = k - np.divide(excess, slope, out=np.zeros_like(excess), where=slope != 0)
+
+    return implied ** k
+
+
+def shin_probabilities(odds: np.ndarray) -> np.ndarray:
+    # Shin method: z is the share of insider trading, such that
+    # probabilities p(z) sum to 1. Solved with bisection (z in [0, 1)).
+    implied = 1 / odds
+    booksum = implied.sum(axis=1, keepdims=True)
+    low = np.zeros((odds.shape[0], 1))
+    high = np.full((odds.shape[0], 1), 0.99)
+
+    def shin(z: np.ndarray) -> np.ndarray:
+        return (np.sqrt(z ** 2 + 4 * (1 - z) * implied ** 2 / booksum) - z) / (2 * (1 - z))
+
+    for _ in range(ITERATIONS):
+        z = (low + high) / 2
+        too_high = shin(z).sum(axis=1, keepdims=True) < 1
+        high = np.where(too_high, z, high)
+        low = np.where(too_high, low, z)
+
+    return shin((low + high) / 2)
+
+
+METHODS = {
+    'power': power_probabilities,
+    'shin': shin_probabilities,
+}
+
+
+def remove_margin(odds: np.ndarray, method: str = 'power') -> np.ndarray:
+    odds = np.asarray(odds, dtype=float)
+    if odds.size == 0:
+        return odds
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return METHODS[method](odds)
@@ -0,0 +1,99 @@
+"""
+Requests rate limiter.
+
+Token bucket, that follows the quota headers returned by the API:
+per-minute limit and remaining requests, daily remaining requests.
+Requests are let through at the highest rate the quota allows.
+
+"""
+
+import asyncio
+import time
+from typing import Mapping, Union
+
+from config.components.configs import API_CONFIG
+
+# Quota headers of the API.
+MINUTE_LIMIT_HEADER = 'x-ratelimit-limit'
+MINUTE_REMAINING_HEADER = 'x-ratelimit-remaining'
+DAILY_LIMIT_HEADER = 'x-ratelimit-requests-limit'
+DAILY_REMAINING_HEADER = 'x-ratelimit-requests-remaining'
+
+
+class QuotaExhausted(Exception):
+    """ The daily quota of the API is used up. """
+
+
+class RateLimiter:
+
+    def __init__(self, requests_per_minute: int = API_CONFIG.requests_per_minute):
+        self.set_capacity(requests_per_minute)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.minute_remaining = None
+        self.daily_limit = None
+        self.daily_remaining = None
+
+    def set_capacity(self, requests_per_minute: int) -> None:
+        self.capacity = max(requests_per_minute, 1)
+        self.rate = self.capacity / 60
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        # Wait for a free token. There is no await between the check
+        # and the take, so concurrent tasks can't take the same token.
+        while True:
+            if self.daily_remaining is not None and self.daily_remaining <= 0:
+                raise QuotaExhausted
+            self.refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                if self.daily_remaining is not None:
+                    self.daily_remaining -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def update(self, headers: Mapping) -> None:
+        # Sync the bucket with the quota reported by the API.
+        minute_limit = to_int(headers.get(MINUTE_LIMIT_HEADER))
+        if minute_limit is not None:
+            self.set_capacity(minute_limit)
+        minute_remaining = to_int(headers.get(MINUTE_REMAINING_HEADER))
+        if minute_remaining is not None:
+            self.minute_remaining = minute_remaining
+            self.refill()
+            self.tokens = min(self.tokens, minute_remaining)
+        daily_limit = to_int(headers.get(DAILY_LIMIT_HEADER))
+        if daily_limit is not None:
+            self.daily_limit = daily_limit
+        daily_remaining = to_int(headers.get(DAILY_REMAINING_HEADER))
+        if daily_remaining is not None:
+            self.daily_remaining = daily_remaining
+
+    @property
+    def remaining(self) -> dict:
+        # Remaining quota, as known from the latest response.
+        return {
+            'minute_limit': self.capacity,
+            'minute_remaining': self.minute_remaining,
+            'daily_limit': self.daily_limit,
+            'daily_remaining': self.daily_remaining,
+        }
+
+    def reset(self) -> None:
+        # Forget the reported quota (e.g. at the end of a scout run,
+        # the daily quota may be renewed before the next one).
+        self.minute_remaining = None
+        self.daily_limit = None
+        self.daily_remaining = None
+
+
+def to_int(value: str) -> Union[int, None]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
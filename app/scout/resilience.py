@@ -0,0 +1,123 @@
+"""
+Resilience policy of the API requests.
+
+- Outcome: the result of a request (data or the reason of a failure),
+  returned to the parsers as well, so a failure is not taken for 'no data'.
+- Retry policy: retryable failures (429, 5xx, timeouts, connection errors)
+  are retried with jittered exponential backoff, 'Retry-After' is respected,
+  while the deadline of the request allows.
+- Circuit breaker: an endpoint, that keeps failing, is not requested
+  for a while, so a scout run doesn't wait for it on every batch.
+
+"""
+
+import random
+import time
+from typing import NamedTuple, Union
+
+from config.components.configs import API_CONFIG
+
+# Outcome statuses.
+OK = 'ok'
+HTTP_ERROR = 'http_error'
+API_ERROR = 'api_error'
+TIMEOUT = 'timeout'
+CONNECTION_ERROR = 'connection_error'
+CIRCUIT_OPEN = 'circuit_open'
+QUOTA_EXHAUSTED = 'quota_exhausted'
+DEADLINE_EXCEEDED = 'deadline_exceeded'
+# No recorded response in the replay mode of the cache.
+CACHE_MISS = 'cache_miss'
+
+RETRYABLE_HTTP_STATUSES = (429, 500, 502, 503, 504)
+# Failures, that tell nothing about the health of the endpoint, don't trip the breaker.
+NEUTRAL_STATUSES = (OK, API_ERROR, CIRCUIT_OPEN, QUOTA_EXHAUSTED, CACHE_MISS)
+
+
+class Outcome(NamedTuple):
+    # Data: the whole API data of a page (APIClient.request)
+    # or the list of response items (APIClient.fetch).
+    status: str
+    data: Union[dict, list] = {}
+    http_status: Union[int, None] = None
+    attempts: int = 0
+    error: Union[str, None] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == OK
+
+
+class RetryPolicy:
+
+    def __init__(
+            self,
+            max_retries: int = API_CONFIG.max_retries,
+            backoff_base: float = API_CONFIG.backoff_base,
+            backoff_cap: float = API_CONFIG.backoff_cap,
+            deadline: float = API_CONFIG.request_deadline):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.deadline = deadline
+
+    def delay(self, attempt: int, retry_after: Union[float, None] = None) -> float:
+        # Full jitter: a random delay up to the exponential backoff,
+        # but not shorter than the API asks for.
+        backoff = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            return max(backoff, retry_after)
+        return backoff
+
+
+class CircuitBreaker:
+    # Closed: requests go as usual.
+    # Open: requests are not sent till reset_timeout has passed.
+    # Half-open: one trial request decides whether to close or open the breaker again.
+
+    def __init__(
+            self,
+            failure_threshold: int = API_CONFIG.breaker_threshold,
+            reset_timeout: float = API_CONFIG.breaker_reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = None
+        self.trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened is None:
+            return 'closed'
+        if time.monotonic() - self.opened >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half-open' and not self.trial:
+            self.trial = True
+            return True
+        return False
+
+    def record(self, outcome: Outcome) -> None:
+        if outcome.status in NEUTRAL_STATUSES:
+            if outcome.ok:
+                self.failures = 0
+                self.opened = None
+            self.trial = False
+            return
+        self.failures += 1
+        if self.trial or self.failures >= self.failure_threshold:
+            self.opened = time.monotonic()
+        self.trial = False
+
+
+def retry_after(headers) -> Union[float, None]:
+    # Seconds to wait from the 'Retry-After' header (the date form is not used by the API).
+    try:
+        return max(float(headers.get('Retry-After')), 0)
+    except (TypeError, ValueError):
+        return None
@@ -3,22 +3,100 @@ Main file for crontab to parse data from the API.
 
 """
 
-import time
+import asyncio
+from typing import Any, Coroutine
+
+from asgiref.sync import sync_to_async
+from django.db import connections
 
 from logs.logger import scout_logger as logger
-from scout import (update_events, update_lineups, update_odds, update_scores,
-                   update_standings, update_stats)
+from scout import (update_details, update_live, update_odds, update_scores,
+                   update_standings)
+from scout.client import api_client
+from scout.lookups import lookups
+from scout.metrics import metrics
+
+# Updaters that run at the same time, after the scores are updated.
+# Odds are refreshed by a lane of their own (see odds_updaters).
+CONCURRENT_UPDATERS = (
+    # Events, lineups and statistics with one request per several games.
+    update_details,
+    update_standings,
+)
+
+
+async def closing_connections(coro: Coroutine) -> Any:
+    # DB work of sync_to_async is done by the asgiref thread, that lives as long as the worker.
+    # Its connections are closed after every run, so a DB restart or an idle timeout
+    # doesn't break the next runs.
+    try:
+        return await coro
+    finally:
+        await sync_to_async(connections.close_all)()
+
+
+async def run_stage(module) -> None:
+    with metrics.stage(module.__name__.split('.')[-1]):
+        await module.manager().update()
+
+
+async def run_updaters() -> None:
+    # Scores go first: the other updaters select games by their fresh status.
+    await run_stage(update_scores)
+    # The rest share one event loop, connections pool and API quota.
+    results = await asyncio.gather(
+        *(run_stage(module) for module in CONCURRENT_UPDATERS),
+        return_exceptions=True,
+    )
+    for module, result in zip(CONCURRENT_UPDATERS, results):
+        if isinstance(result, Exception):
+            logger.error('%s failed: %r', module.__name__, result)
+    with metrics.stage('compact_history'):
+        await sync_to_async(update_odds.compact_history)()
 
 
 def updaters():
     logger.info('Scout launched.')
-    update_scores.updater()
-    update_odds.updater()
-    # The API has limitations on the number of requests per minute.
-    # So, we need to pause the script after the most expensive part.
-    time.sleep(90)
-    update_stats.updater()
-    update_events.updater()
-    update_lineups.updater()
-    update_standings.updater()
+    # Teams and tournaments are read from the DB once per run.
+    lookups.clear()
+    metrics.reset()
+    try:
+        with metrics.stage('total'):
+            api_client.run(closing_connections(run_updaters()))
+        logger.info('API quota left: %s.', api_client.quota)
+        for period in ('minute', 'daily'):
+            metrics.set('scout_api_quota_remaining', api_client.quota[f'{period}_remaining'], period=period)
+    finally:
+        # Release pooled connections of the shared API client.
+        api_client.close()
+        logger.info('Scout metrics: %s.', metrics.write())
     logger.info('Scout has completed.')
+
+
+def odds_updaters():
+    # Frequent odds refresh: only games, that are due, are requested.
+    # Lookups are read anew by every lane run: a worker may run lanes only,
+    # so new tournaments and seasons are not missed.
+    lookups.clear()
+    # Metrics are reset and written by every lane run, so a long-lived worker doesn't pile them up.
+    metrics.reset()
+    try:
+        with metrics.stage('odds'):
+            api_client.run(closing_connections(update_odds.manager().update()))
+    finally:
+        api_client.close()
+        metrics.write(lane='odds')
+
+
+def live_updaters() -> bool:
+    # One poll of live games, return True while the live lane should go on.
+    lookups.clear()
+    metrics.reset()
+    live_manager = update_live.manager()
+    try:
+        with metrics.stage('live'):
+            api_client.run(closing_connections(live_manager.update()))
+    finally:
+        api_client.close()
+        metrics.write(lane='live')
+    return live_manager.updater.is_running()
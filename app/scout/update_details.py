@@ -0,0 +1,66 @@
+"""
+Get games details from the Api.
+
+Make one request per several latest games to get their events,
+lineups and statistics at once, and fill the empty fields in the DB.
+"""
+
+from django.db.models import Q, QuerySet
+
+from arena.models import Game
+from scout.parsers import FixturesDetailsParser
+from scout.update_events import EventsUpdater
+from scout.update_lineups import LineupsUpdater
+from scout.update_stats import StatsUpdater
+from scout.updaters import GameDetailsUpdater
+from scout.updates_managers import DetailsUpdatesManager, UpdatesManager
+
+
+class FixturesDetailsUpdater(GameDetailsUpdater):
+
+    def __init__(self, sections: dict):
+        # Sections of the fixture data and updaters to process them,
+        # e.g. {'events': EventsUpdater(...)}.
+        self.sections = sections
+        fields_to_update = []
+        for section_updater in sections.values():
+            fields_to_update.extend(section_updater.fields_to_update)
+        super().__init__(field_to_check='', fields_to_update=fields_to_update, related='home_team')
+
+    def get_games_from_db(self) -> QuerySet:
+        # Get a list of games ids with any of the details missing.
+        missing = Q()
+        for section_updater in self.sections.values():
+            missing |= Q(**{section_updater.field_to_check + '__isnull': True})
+        return Game.objects.filter(missing, **self.filter_data).values_list(
+            'api_game_id',
+            flat=True,
+        )
+
+    def update_game(self, game: Game, fixture: dict) -> None:
+        # Fan the fixture sections out to the details updaters.
+        for section, section_updater in self.sections.items():
+            if fixture.get(section) and getattr(game, section_updater.field_to_check) is None:
+                section_updater.update_game(game, fixture[section])
+
+
+def manager() -> UpdatesManager:
+    details_updater = FixturesDetailsUpdater(
+        sections={
+            'events': EventsUpdater(field_to_check='game_events', fields_to_update=['game_events']),
+            'lineups': LineupsUpdater(field_to_check='lineups', fields_to_update=['lineups']),
+            'statistics': StatsUpdater(
+                field_to_check='home_team_stats',
+                fields_to_update=['home_team_stats', 'away_team_stats'],
+            ),
+        },
+    )
+    details_parser = FixturesDetailsParser(url_tail='fixtures')
+    return DetailsUpdatesManager(
+        updater=details_updater,
+        parser=details_parser,
+    )
+
+
+def updater() -> None:
+    manager().start_updating()
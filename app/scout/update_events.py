@@ -5,20 +5,17 @@ Make requests to the Api to get events for the latest games
 with empty 'game_events' field in the DB.
 """
 
-from django.db.models import QuerySet
-
+from arena.models import Game
 from scout.parsers import DetailsParser
 from scout.updaters import GameDetailsUpdater
-from scout.updates_managers import DetailsUpdatesManager
+from scout.updates_managers import DetailsUpdatesManager, UpdatesManager
 
 
 class EventsUpdater(GameDetailsUpdater):
 
-    def update_details(self, games_to_update: QuerySet, games_events: dict) -> None:
-        # Prepare events data and update games in the DB.
-        for game in games_to_update.iterator():
-            events = self.prepare_game_events(games_events[game.api_game_id])
-            game.game_events = events
+    def update_game(self, game: Game, events: list[dict]) -> None:
+        # Prepare events data and set them to the game.
+        game.game_events = self.prepare_game_events(events)
 
     def prepare_game_events(self, data: list[dict]) -> list:
         # Remove excessive data from the Api data,
@@ -28,11 +25,14 @@ class EventsUpdater(GameDetailsUpdater):
 
         return data
 
-def updater() -> None:
+def manager() -> UpdatesManager:
     events_updater = EventsUpdater(field_to_check='game_events', fields_to_update=['game_events'])
     events_parser = DetailsParser(url_tail='fixtures/events')
-    updates_manager = DetailsUpdatesManager(
+    return DetailsUpdatesManager(
         updater=events_updater,
         parser=events_parser,
     )
-    updates_manager.start_updating()
+
+
+def updater() -> None:
+    manager().start_updating()
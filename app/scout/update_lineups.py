@@ -5,20 +5,17 @@ Make requests to the Api to get lineups for the latest games
 with empty 'lineups' field in the DB.
 """
 
-from django.db.models import QuerySet
-
+from arena.models import Game
 from scout.parsers import DetailsParser
 from scout.updaters import GameDetailsUpdater
-from scout.updates_managers import DetailsUpdatesManager
+from scout.updates_managers import DetailsUpdatesManager, UpdatesManager
 
 
 class LineupsUpdater(GameDetailsUpdater):
 
-    def update_details(self, games_to_update: QuerySet, games_lineups: dict) -> None:
-        # Prepare lineups and update games in the DB.
-        for game in games_to_update.iterator():
-            lineups = self.prepare_lineups(games_lineups[game.api_game_id])
-            game.lineups = lineups
+    def update_game(self, game: Game, lineups: list[dict]) -> None:
+        # Prepare lineups and set them to the game.
+        game.lineups = self.prepare_lineups(lineups)
 
     def prepare_lineups(self, data: list[dict]) -> list:
         # Remove excessive data from the Api data,
@@ -32,11 +29,14 @@ class LineupsUpdater(GameDetailsUpdater):
         return data
 
 
-def updater() -> None:
+def manager() -> UpdatesManager:
     lineups_updater = LineupsUpdater(field_to_check='lineups', fields_to_update=['lineups'])
     lineups_parser = DetailsParser(url_tail='fixtures/lineups')
-    updates_manager = DetailsUpdatesManager(
+    return DetailsUpdatesManager(
         updater=lineups_updater,
         parser=lineups_parser,
     )
-    updates_manager.start_updating()
+
+
+def updater() -> None:
+    manager().start_updating()
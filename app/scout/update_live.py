@@ -0,0 +1,105 @@
+"""
+Get live scores from the Api.
+
+All games in play are requested at once (fixtures?live=all),
+only statuses and scores of the games of the running tournaments
+are updated. The live lane is started shortly before kick-off
+and stops itself, when there are no games in play (see celery_tasks).
+"""
+
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from arena.models import Game
+from logs.logger import scout_logger as logger
+from scout.custom_bulks import live_bulk_update
+from scout.lookups import lookups
+from scout.metrics import metrics
+from scout.models import (IN_PLAY_STATUSES, LIVE_STATUSES, LiveRow,
+                          goals_ft, to_int, to_int_or_none, to_str)
+from scout.parsers import LiveParser
+from scout.updates_managers import LiveUpdatesManager, UpdatesManager
+
+# Seconds between two polls of live games.
+LIVE_POLL_INTERVAL = 30
+# The lane is started this number of minutes before kick-off
+# and kept for games, that should have started this number of minutes ago.
+KICKOFF_LEAD = 5
+KICKOFF_DELAY = 30
+
+
+class LiveUpdater:
+
+    def __init__(self):
+        self.in_play = 0
+
+    def get_live_state(self) -> tuple:
+        # Running tournaments and API ids of games, that are in play according to the DB.
+        tours = lookups.get_running_tours()
+        live_ids = set(
+            Game.objects.filter(
+                status__in=LIVE_STATUSES,
+                tournament__is_running=True,
+            ).values_list('api_game_id', flat=True)
+        )
+
+        return tours, live_ids
+
+    def make_rows(self, games: list) -> list:
+        rows = []
+        for game in games:
+            score = game['score']
+            rows.append(LiveRow(
+                api_game_id=to_int(game['fixture']['id']),
+                status=to_str(game['fixture']['status']['long']),
+                home_goals_ht=to_int_or_none(score['halftime']['home']),
+                away_goals_ht=to_int_or_none(score['halftime']['away']),
+                home_goals_ft=goals_ft(game, 'home'),
+                away_goals_ft=goals_ft(game, 'away'),
+                home_goals_et=to_int_or_none(score['extratime']['home']),
+                away_goals_et=to_int_or_none(score['extratime']['away']),
+                home_goals_pen=to_int_or_none(score['penalty']['home']),
+                away_goals_pen=to_int_or_none(score['penalty']['away']),
+            ))
+
+        return rows
+
+    def update_games(self, games: list) -> None:
+        rows = self.make_rows(games)
+        self.in_play = sum(row.status in IN_PLAY_STATUSES for row in rows)
+        updated = live_bulk_update(rows)
+        metrics.inc('scout_rows_validated_total', len(rows), updater=type(self).__name__)
+        metrics.inc('scout_rows_updated_total', updated, updater=type(self).__name__, table='game')
+        logger.info('Live: %s games in play, %s updated.', self.in_play, updated)
+
+    def is_running(self) -> bool:
+        # The lane goes on, while there are games in play or about to start.
+        # Suspended and interrupted games don't keep it: they are polled
+        # by the lane starts only (see celery_tasks.start_live_scores).
+        return self.in_play > 0 or is_due(IN_PLAY_STATUSES)
+
+
+def is_due(statuses: tuple = LIVE_STATUSES) -> bool:
+    # Check if there are games with the statuses or about to start.
+    now = timezone.now()
+    return Game.objects.filter(
+        Q(status__in=statuses) | Q(
+            status='Not Started',
+            game_date__gte=now - timedelta(minutes=KICKOFF_DELAY),
+            game_date__lte=now + timedelta(minutes=KICKOFF_LEAD),
+        ),
+        tournament__is_running=True,
+    ).exists()
+
+
+def manager() -> UpdatesManager:
+    return LiveUpdatesManager(
+        updater=LiveUpdater(),
+        parser=LiveParser(url_tail='fixtures'),
+    )
+
+
+def updater() -> None:
+    manager().start_updating()
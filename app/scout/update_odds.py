@@ -1,70 +1,175 @@
 """
 Get games odds from the Api.
 
-Make requests to the Api to get odds for the upcoming games
-with empty 'game_odds' field in the DB.
+Make requests to the Api to get odds for the upcoming games.
+Odds of a game are refreshed the more often, the closer its kick-off is,
+and the less often, the longer its prices don't move.
+Every update is appended to the odds history, while 'game_odds'
+field ([open, last] prices) is rewritten only if prices have changed.
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from django.db.models import QuerySet
+import numpy as np
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
-from scout.parsers import DetailsParser
+from arena.models import Game, OddsHistory
+from config.components.configs import ODDS_CONFIG
+from scout.journal import NullJournal
+from scout.metrics import metrics
+from scout.odds_aggregator import OddsAggregator
+from scout.parsers import OddsParser
+from scout.probabilities import remove_margin
 from scout.updaters import GameDetailsUpdater
-from scout.updates_managers import DetailsUpdatesManager
+from scout.updates_managers import DetailsUpdatesManager, UpdatesManager
+
+# Odds history of games, that took place earlier, is compacted (days).
+HISTORY_COMPACTION_DELTA = 3
+# Games of this range before the delta are compacted by every run (days),
+# so games, that are compacted already, are not windowed again and again.
+HISTORY_COMPACTION_RANGE = 1
+# The way to aggregate prices of all bookies: mean, median, trimmed_mean or best.
+ODDS_AGGREGATION = 'mean'
+# Markets with margin-free probabilities: bet type -> {bet value: game field}.
+PROBABILITY_MARKETS = {
+    'Match Winner': {'Home': 'home_win_prob', 'Draw': 'draw_prob', 'Away': 'away_win_prob'},
+    'Goals Over/Under': {'Under 2.5': 'under_prob', 'Over 2.5': 'over_prob'},
+}
+# The way to remove the margin: power or shin.
+MARGIN_METHOD = 'power'
+# Odds refresh intervals: (time to kick-off up to, interval).
+REFRESH_INTERVALS = (
+    (timedelta(hours=2), timedelta(minutes=10)),
+    (timedelta(hours=24), timedelta(hours=1)),
+    (timedelta(days=3), timedelta(hours=6)),
+    (timedelta.max, timedelta(days=1)),
+)
+# Every poll without price movement doubles the interval, up to this number of times.
+MAX_BACKOFF = 3
+# Odds are polled every 10 minutes (celery refresh_odds) and games are stamped
+# after their odds are fetched, so games, that are due within half of the period, are polled now.
+POLL_GRACE = timedelta(minutes=5)
 
 
 class OddsUpdater(GameDetailsUpdater):
 
-    def update_details(self, games_to_update: QuerySet, games_odds: dict) -> None:
-        # Prepare events data and update games in the DB.
-        for game in games_to_update.iterator():
-            api_odds = self.prepare_odds(games_odds[game.api_game_id])
-            odds = self.combine_odds(game.game_odds, api_odds)
-            if 'Match Winner' in odds:
-                home_team_class, away_team_class = self.determine_team_class(odds['Match Winner'])
-            else:
-                home_team_class, away_team_class = 0, 0
-            game.game_odds = odds
-            game.home_team_class = home_team_class
-            game.away_team_class = away_team_class
-
-    def prepare_odds(self, data: list[dict]) -> dict:
-        # Get odds from Api as the next structure:
-        # bookie -> bet type (e.g. 'Match Winner') ->
-        # bet value (e.g. 'Home') -> odds value (e.g. 2.20).
-        # Then convert to the new structure:
-        # bet type -> bet value -> [odds values].
-        odds_collection = {}
-        bookies = data[0]['bookmakers']
-        for bookie in bookies:
-            bets = bookie['bets']
-            for bet in bets:
-                name = bet['name']
-                odds_collection.setdefault(name, {})
-                values = bet['values']
-                for value in values:
-                    if 'odd' in value:
-                        odds_collection[name].setdefault(
-                            value['value'],
-                            [],
-                        ).append(value['odd'])
-        return odds_collection
-
-    def combine_odds(self, obj_odds: dict, odds_collection: dict) -> dict:
-        # Add new odds to the lists of odds values.
+    def __init__(self, *args, aggregation: str = ODDS_AGGREGATION, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.aggregator = OddsAggregator(
+            aggregation,
+            bets=ODDS_CONFIG.bets,
+            bookmakers=ODDS_CONFIG.bookmakers,
+        )
+
+    def get_refresh_interval(self, time_to_kickoff: timedelta, unchanged: int) -> timedelta:
+        for time_limit, interval in REFRESH_INTERVALS:
+            if time_to_kickoff <= time_limit:
+                return interval * 2 ** min(unchanged, MAX_BACKOFF)
+
+    def get_games_from_db(self) -> list:
+        # Get a list of games ids, which odds should be refreshed.
+        now = timezone.now()
+        games = Game.objects.filter(**self.filter_data).values_list(
+            'api_game_id', 'game_date', 'odds_checked', 'odds_unchanged',
+        )
+        return [
+            api_game_id
+            for api_game_id, game_date, odds_checked, odds_unchanged in games
+            if odds_checked is None
+            or now - odds_checked >= self.get_refresh_interval(game_date - now, odds_unchanged or 0) - POLL_GRACE
+        ]
+
+    def update_details(self, games_to_update: list, games_odds: dict) -> None:
+        # Aggregate odds of the whole batch at once.
+        self.taken_at = timezone.now()
+        self.history = []
+        self.changed_games = []
+        self.unchanged_games = []
+        super().update_details(games_to_update, self.aggregator.aggregate(games_odds))
+
+    def update_game(self, game: Game, av_odds: dict) -> None:
+        # Add aggregated odds to the history
+        # and set them to the game, if prices have changed.
+        # Games without odds in the response count as unchanged.
+        for market, selections in av_odds.items():
+            for selection, price in selections.items():
+                self.history.append(
+                    OddsHistory(
+                        game=game,
+                        market=market,
+                        selection=selection,
+                        taken_at=self.taken_at,
+                        price=price,
+                    )
+                )
+        if not av_odds or not self.odds_changed(game.game_odds, av_odds):
+            self.unchanged_games.append(game.id)
+            return
+        odds = self.combine_odds(game.game_odds, av_odds)
+        if 'Match Winner' in odds:
+            home_team_class, away_team_class = self.determine_team_class(odds['Match Winner'])
+        else:
+            home_team_class, away_team_class = 0, 0
+        game.game_odds = odds
+        game.home_team_class = home_team_class
+        game.away_team_class = away_team_class
+        game.odds_checked = self.taken_at
+        game.odds_unchanged = 0
+        self.changed_games.append(game)
+
+    def set_probabilities(self, games: list) -> None:
+        # Margin-free probabilities from the last prices,
+        # calculated for all the games of the batch at once.
+        for market, selections in PROBABILITY_MARKETS.items():
+            odds = np.array([
+                [
+                    (game.game_odds.get(market, {}).get(selection) or [np.nan, np.nan])[1]
+                    for selection in selections
+                ]
+                for game in games
+            ], dtype=float).reshape(len(games), len(selections))
+            probabilities = remove_margin(odds, MARGIN_METHOD)
+            for game, game_probabilities in zip(games, probabilities):
+                for field, probability in zip(selections.values(), game_probabilities):
+                    setattr(game, field, None if np.isnan(probability) else round(float(probability), 4))
+
+    def update_games(self, games_to_update: list) -> None:
+        # Append the odds history and update only games with changed prices.
+        # For the rest, only count polls without price movement.
+        self.set_probabilities(self.changed_games)
+        OddsHistory.objects.bulk_create(self.history, batch_size=1000)
+        updated = self.unit_of_work.flush(games_to_update)
+        metrics.inc('scout_rows_created_total', len(self.history), updater=type(self).__name__, table='odds_history')
+        metrics.inc('scout_rows_updated_total', updated, updater=type(self).__name__, table='game')
+        Game.objects.filter(id__in=self.unchanged_games).update(
+            odds_checked=self.taken_at,
+            odds_unchanged=Coalesce(F('odds_unchanged'), Value(0)) + 1,
+        )
+
+    def odds_changed(self, obj_odds: dict, av_odds: dict) -> bool:
+        # Check if there are new bets or new last prices.
+        if obj_odds is None:
+            return True
+        for key, subkeys in av_odds.items():
+            for subkey, av_value in subkeys.items():
+                if obj_odds.get(key, {}).get(subkey, [1, 1])[1] != av_value:
+                    return True
+        return False
+
+    def combine_odds(self, obj_odds: dict, av_odds: dict) -> dict:
+        # Add new average odds to the lists of odds values.
         now = datetime.now().strftime('%Y-%m-%d %H:%M')
         if obj_odds is None:
             obj_odds = {'created': now, 'updated': now}
-        for key, subkeys in odds_collection.items():
-            for subkey, value in subkeys.items():
+        for key, subkeys in av_odds.items():
+            for subkey, av_value in subkeys.items():
                 obj_odds.setdefault(key, {}).setdefault(subkey, [1, 1])
                 odds_list = obj_odds[key][subkey]
-                # Average value of the odds for all bookies.
-                av_odds = round(sum([float(item) for item in value]) / len(value), 2)
                 if odds_list[0] == 1:
-                    odds_list[0] = av_odds
-                odds_list[1] = av_odds
+                    odds_list[0] = av_value
+                odds_list[1] = av_value
         obj_odds['updated'] = datetime.now().strftime('%Y-%m-%d %H:%M')
         return obj_odds
 
@@ -87,15 +192,41 @@ class OddsUpdater(GameDetailsUpdater):
         return (home_team_class, away_team_class)
 
 
-def updater() -> None:
+def odds_filters() -> dict:
+    # The API filters by one bet and one bookmaker only,
+    # otherwise the whitelist is applied while parsing.
+    params = {}
+    if len(ODDS_CONFIG.bets) == 1:
+        params['bet'] = ODDS_CONFIG.bets[0]
+    if len(ODDS_CONFIG.bookmakers) == 1:
+        params['bookmaker'] = ODDS_CONFIG.bookmakers[0]
+    return params
+
+
+def manager() -> UpdatesManager:
     odds_updater = OddsUpdater(
         field_to_check='',
-        fields_to_update=['game_odds','home_team_class', 'away_team_class'],
+        fields_to_update=[
+            'game_odds', 'home_team_class', 'away_team_class',
+            'home_win_prob', 'draw_prob', 'away_win_prob', 'under_prob', 'over_prob',
+            'odds_checked', 'odds_unchanged',
+        ],
         status='Not Started',
     )
-    odds_parser = DetailsParser(url_tail='odds')
-    updates_manager = DetailsUpdatesManager(
+    odds_parser = OddsParser(url_tail='odds', params=odds_filters())
+    return DetailsUpdatesManager(
         updater=odds_updater,
         parser=odds_parser,
+        # Odds are taken at the time of the update, they are not replayed.
+        journal=NullJournal(),
     )
-    updates_manager.start_updating()
+
+
+def updater() -> None:
+    manager().start_updating()
+
+
+def compact_history() -> None:
+    # Downsample the odds history of past games to open and last prices.
+    date_before = timezone.now() - timedelta(days=HISTORY_COMPACTION_DELTA)
+    OddsHistory.objects.compact(date_before, date_before - timedelta(days=HISTORY_COMPACTION_RANGE))
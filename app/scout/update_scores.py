@@ -4,18 +4,22 @@ Get games main data from the Api.
 Make requests to the Api to get the next data:
 - List of upcoming games.
 - Latest games results.
+Tournaments are polled around their games and once a day otherwise.
 """
 
 from scout.parsers import ScoresParser
 from scout.updaters import ScoresUpdater
-from scout.updates_managers import ScoresUpdatesManager
+from scout.updates_managers import ScoresUpdatesManager, UpdatesManager
 
 
-def updater() -> None:
+def manager() -> UpdatesManager:
     scores_updater = ScoresUpdater()
     scores_parser = ScoresParser(url_tail='fixtures')
-    updates_manager = ScoresUpdatesManager(
+    return ScoresUpdatesManager(
         updater=scores_updater,
         parser=scores_parser,
     )
-    updates_manager.start_updating()
+
+
+def updater() -> None:
+    manager().start_updating()
@@ -1,19 +1,23 @@
 """
 Get standings.
 
-Parse API standings for each tournament, that is running.
+Derive standings of running tournaments with newly finished games
+from the DB, parse API standings only to get groups of a tournament.
 """
 
 from scout.parsers import StandingsParser
 from scout.updaters import StandingsUpdater
-from scout.updates_managers import StandingsUpdatesManager
+from scout.updates_managers import StandingsUpdatesManager, UpdatesManager
 
 
-def updater() -> None:
+def manager() -> UpdatesManager:
     standings_updater = StandingsUpdater()
     standings_parser = StandingsParser(url_tail='standings')
-    updates_manager = StandingsUpdatesManager(
+    return StandingsUpdatesManager(
         updater=standings_updater,
         parser=standings_parser,
     )
-    updates_manager.start_updating()
+
+
+def updater() -> None:
+    manager().start_updating()
@@ -3,15 +3,25 @@ Read and write data from the database.
 
 """
 
+import hashlib
+import json
+from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
 
-from django.db.models import QuerySet
+from django.db.models import (BooleanField, Count, ExpressionWrapper, F, Q,
+                              QuerySet, Sum)
 from django.template.defaultfilters import slugify
+from django.utils import timezone
 
-from arena.models import Game, Team, Tournament
+from arena.models import Game, Tournament
+from arena.unit_of_work import UnitOfWork
+from logs.logger import scout_logger as logger
 from scout.custom_bulks import (game_bulk_update_or_create,
                                 team_bulk_get_or_create)
-from scout.models import GameModel, TeamModel
+from scout.lookups import lookups
+from scout.metrics import metrics
+from scout.models import (LIVE_STATUSES, GameRow, TeamModel, goals_ft, to_int,
+                          to_int_or_none, to_str, to_str_or_none)
 
 # The range for which games details should be parsed.
 DETAILS_DELTA_BOTTOM = 3
@@ -19,9 +29,17 @@ DETAILS_DELTA_TOP = 7
 # Posting time in hours relative to game date.
 PUB_DATE_NORM = 56
 PUB_DATE_MIN = 2
+# Scores of a tournament are polled from this number of hours before kick-off
+# of its games till this number of hours after, the rest of the time once a day.
+SCORES_LEAD = 1
+SCORES_TRAIL = 4
+SCORES_SWEEP = 24
+# Games, that are counted in the standings.
+FINISHED_STATUS = 'Match Finished'
+STATS_FIELDS = ('played', 'win', 'draw', 'lose', 'goals_for', 'goals_against')
 
 
-class GameDetailsUpdater:
+class GameDetailsUpdater(ABC):
 
     def __init__(
             self,
@@ -39,8 +57,10 @@ class GameDetailsUpdater:
         }
         if field_to_check:
             self.filter_data[field_to_check + '__isnull'] = True
+        self.field_to_check = field_to_check
         self.fields_to_update = fields_to_update
         self.related = related
+        self.unit_of_work = UnitOfWork(Game, fields_to_update)
 
     def get_games_from_db(self) -> QuerySet:
         # Get a list of games ids to parse from API.
@@ -49,132 +69,418 @@ class GameDetailsUpdater:
             flat=True,
         )
 
-    def get_games_to_update(self, games_details: dict) -> QuerySet:
-        # Get a list of games with parsed details data.
+    def get_games_to_update(self, games_details: dict) -> list:
+        # Get games with parsed details data, registered to track their changes.
+        return self.unit_of_work.track_all(Game.objects.filter(api_game_id__in=games_details.keys()))
+
+    def update_details(self, games_to_update: list, games_details: dict) -> None:
+        # Prepare details data and set them to the games.
+        # API ids of the related teams are taken from the lookups instead of a join.
+        metrics.inc('scout_rows_validated_total', len(games_details), updater=type(self).__name__)
         if self.related:
-            return Game.objects.filter(
-                api_game_id__in=games_details.keys()
-            ).select_related(self.related)
-
-        return Game.objects.filter(api_game_id__in=games_details.keys())
-
-    def update_games(self, games_to_update: QuerySet) -> None:
-        # Update games details in the DB.
-        Game.objects.bulk_update(
-            games_to_update,
-            self.fields_to_update,
-            batch_size=100,
-        )
+            lookups.get_team_api_ids([getattr(game, self.related + '_id') for game in games_to_update])
+        for game in games_to_update:
+            self.update_game(game, games_details[game.api_game_id])
+
+    @abstractmethod
+    def update_game(self, game: Game, details: list) -> None:
+        """ Set game fields from the API details of the game. """
+
+    def update_games(self, games_to_update: list) -> None:
+        # Update only changed details in the DB.
+        updated = self.unit_of_work.flush(games_to_update)
+        metrics.inc('scout_rows_updated_total', updated, updater=type(self).__name__, table='game')
 
 
 class ScoresUpdater:
 
     def get_running_tours(self) -> dict:
         # List of tournaments that will be assigned for each game (to prevent multiple queries).
-        return {tour.api_tour_id: tour for tour in Tournament.objects.filter(is_running=True)}
+        # Only tournaments, that are due, are polled:
+        # games are about to start, in play or just finished, or the daily sweep is due.
+        self.checked_at = timezone.now()
+        sweep_from = self.checked_at - timedelta(hours=SCORES_SWEEP)
+        matchday_tours = set(
+            Game.objects.filter(
+                Q(status__in=LIVE_STATUSES) | Q(
+                    game_date__gte=self.checked_at - timedelta(hours=SCORES_TRAIL),
+                    game_date__lte=self.checked_at + timedelta(hours=SCORES_LEAD),
+                ),
+                tournament__is_running=True,
+            ).order_by().values_list('tournament__api_tour_id', flat=True).distinct()
+        )
+        tours = {
+            api_tour_id: tour
+            for api_tour_id, tour in lookups.get_running_tours().items()
+            if api_tour_id in matchday_tours
+            or tour.scores_checked is None
+            or tour.scores_checked <= sweep_from
+        }
+        logger.info('Scores: %s of %s tours are due.', len(tours), len(lookups.get_running_tours()))
+
+        return tours
+
+    def fingerprint(self, game: dict) -> str:
+        # Hash of the API data of the game, that is saved in the DB.
+        payload = [
+            game['fixture']['date'],
+            game['fixture']['venue'],
+            game['fixture']['referee'],
+            game['fixture']['status']['long'],
+            game['league']['id'],
+            game['league']['season'],
+            game['league']['round'],
+            game['teams']['home'],
+            game['teams']['away'],
+            game['goals'],
+            game['score'],
+        ]
+        return hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def pub_date_is_moving(self, game_date: datetime) -> bool:
+        # Pub date of a game without preview is shifted on every update,
+        # while it is limited by the earliest pub date (see prepare_data).
+        now = datetime.now().astimezone()
+        earliest_pub_date = now + timedelta(hours=PUB_DATE_MIN)
+        normal_pub_date = game_date - timedelta(hours=PUB_DATE_NORM)
+        return normal_pub_date < earliest_pub_date <= game_date + timedelta(hours=4)
+
+    def filter_changed(self, games: list) -> tuple:
+        # Keep only new games and games with changed API data.
+        # Return them with their hashes and the change set.
+        hashes = {game['fixture']['id']: self.fingerprint(game) for game in games}
+        stored = {
+            api_game_id: (payload_hash, no_preview)
+            for api_game_id, payload_hash, no_preview in Game.objects.filter(
+                api_game_id__in=hashes.keys(),
+            ).annotate(
+                no_preview=ExpressionWrapper(Q(preview__isnull=True), output_field=BooleanField()),
+            ).values_list('api_game_id', 'payload_hash', 'no_preview')
+        }
+        changes = {'new': [], 'changed': [], 'unchanged': 0}
+        games_to_load = []
+        for game in games:
+            api_game_id = game['fixture']['id']
+            if api_game_id not in stored:
+                changes['new'].append(api_game_id)
+            elif stored[api_game_id][0] != hashes[api_game_id]:
+                changes['changed'].append(api_game_id)
+            elif stored[api_game_id][1] and self.pub_date_is_moving(
+                    datetime.fromisoformat(game['fixture']['date'])):
+                # The data is the same, but the pub date should be shifted.
+                changes['changed'].append(api_game_id)
+            else:
+                changes['unchanged'] += 1
+                continue
+            games_to_load.append(game)
+
+        return games_to_load, hashes, changes
 
     def prepare_data(self, games: list, tours: dict) -> dict:
+        # Skip games, that haven't changed since the last update.
+        games, hashes, changes = self.filter_changed(games)
+        logger.info(
+            'Scores: %s new, %s changed, %s unchanged games.',
+            len(changes['new']), len(changes['changed']), changes['unchanged'],
+        )
+
         # List of teams, participating in games, that will be assigned for each game.
-        # teams = {team['id']: team['name'] for game in games for team in game['teams'].values()}
+        # Only teams, that are unknown yet, are sent to the DB.
         teams = {
             team['id']: TeamModel(api_team_id=team['id'], name=team['name'])
             for game in games
             for team in game['teams'].values()
         }
-        teams_objs = team_bulk_get_or_create(teams)
+        teams_objs = lookups.get_teams(teams.keys())
+        new_teams = {api_team_id: team for api_team_id, team in teams.items() if api_team_id not in teams_objs}
+        if new_teams:
+            created = team_bulk_get_or_create(new_teams)
+            lookups.add_teams(created)
+            teams_objs.update(created)
+            metrics.inc(
+                'scout_rows_created_total',
+                sum(team.created for team in created.values()),
+                updater=type(self).__name__,
+                table='team',
+            )
 
-        data_to_load = {}
+        rows = self.make_rows(games, tours, teams_objs, hashes)
+        metrics.inc('scout_rows_validated_total', len(rows), updater=type(self).__name__)
 
-        for game in games:
-            tour = tours.get(game['league']['id'])
-            home_team = teams_objs.get(game['teams']['home']['id'])
-            away_team = teams_objs.get(game['teams']['away']['id'])
-            game_date = datetime.fromisoformat(game['fixture']['date'])
+        return rows
+
+    def make_rows(self, games: list, tours: dict, teams_objs: dict, hashes: dict) -> dict:
+        # Validate API games and convert them to rows for the DB.
+        rows = {}
+        earliest_pub_date = (datetime.now() + timedelta(hours=PUB_DATE_MIN)).astimezone()
+        pub_date_norm = timedelta(hours=PUB_DATE_NORM)
+        pub_date_max = timedelta(hours=4)
 
-            normal_pub_date = (game_date - timedelta(hours=PUB_DATE_NORM)).astimezone()
-            earliest_pub_date = (datetime.now() + timedelta(hours=PUB_DATE_MIN)).astimezone()
+        for game in games:
+            fixture = game['fixture']
+            league = game['league']
+            score = game['score']
+            tour = tours.get(league['id'])
+            if tour is None:
+                continue
+            home_team = teams_objs[game['teams']['home']['id']]
+            away_team = teams_objs[game['teams']['away']['id']]
+            game_date = datetime.fromisoformat(fixture['date'])
+
+            normal_pub_date = (game_date - pub_date_norm).astimezone()
             pub_date = max(normal_pub_date, earliest_pub_date)
-            if pub_date > game_date + timedelta(hours=4):
+            if pub_date > game_date + pub_date_max:
                 pub_date = None
             slug = slugify('-'.join([game_date.strftime('%Y-%m-%d'), home_team.name, away_team.name]))
 
-            validated_game_data = GameModel(
-                api_game_id=game['fixture']['id'],
+            api_game_id = to_int(fixture['id'])
+            rows[api_game_id] = GameRow(
+                api_game_id=api_game_id,
                 game_date=game_date,
-                venue=game['fixture']['venue']['name'],
-                city=game['fixture']['venue']['city'],
-                referee=game['fixture']['referee'],
-                status=game['fixture']['status']['long'],
-                season=game['league']['season'],
-                round=game['league']['round'],
-                home_goals_ht=game['score']['halftime']['home'],
-                away_goals_ht=game['score']['halftime']['away'],
-                home_goals_ft=game['score']['fulltime']['home'],
-                away_goals_ft=game['score']['fulltime']['away'],
-                home_goals_et=game['score']['extratime']['home'],
-                away_goals_et=game['score']['extratime']['away'],
-                home_goals_pen=game['score']['penalty']['home'],
-                away_goals_pen=game['score']['penalty']['away'],
+                venue=to_str_or_none(fixture['venue']['name']),
+                city=to_str_or_none(fixture['venue']['city']),
+                referee=to_str_or_none(fixture['referee']),
+                status=to_str(fixture['status']['long']),
+                tournament_id=tour.id,
+                season=to_int(league['season']),
+                round=to_str_or_none(league['round']),
+                home_team_id=home_team.id,
+                away_team_id=away_team.id,
+                home_goals_ht=to_int_or_none(score['halftime']['home']),
+                away_goals_ht=to_int_or_none(score['halftime']['away']),
+                home_goals_ft=goals_ft(game, 'home'),
+                away_goals_ft=goals_ft(game, 'away'),
+                home_goals_et=to_int_or_none(score['extratime']['home']),
+                away_goals_et=to_int_or_none(score['extratime']['away']),
+                home_goals_pen=to_int_or_none(score['penalty']['home']),
+                away_goals_pen=to_int_or_none(score['penalty']['away']),
                 pub_date=pub_date,
                 slug=slug,
+                payload_hash=hashes[fixture['id']],
             )
 
-            data_to_load[game['fixture']['id']] = Game(
-                **validated_game_data.__dict__,
-                home_team=home_team,
-                away_team=away_team,
-                tournament=tour,
-            )
-
-        return data_to_load
+        return rows
 
     def update_or_create_games(self, data_to_load: dict) -> None:
         # Update or create games in the DB.
-        game_bulk_update_or_create(data_to_load)
+        created, updated = game_bulk_update_or_create(data_to_load)
+        metrics.inc('scout_rows_created_total', created, updater=type(self).__name__, table='game')
+        metrics.inc('scout_rows_updated_total', updated, updater=type(self).__name__, table='game')
+
+    def mark_checked(self, tours: dict) -> None:
+        for tour in tours.values():
+            tour.scores_checked = self.checked_at
+        Tournament.objects.filter(id__in=[tour.id for tour in tours.values()]).update(
+            scores_checked=self.checked_at,
+        )
 
 
 class StandingsUpdater():
+    # League tables are derived from the finished games of the DB.
+    # The API is requested only for tournaments without standings or with unknown teams,
+    # since groups and rank descriptions can't be derived from games.
+
+    def get_tours_to_update(self) -> tuple:
+        # Tournaments with newly finished games and tournaments, which standings should be parsed.
+        self.checked_at = timezone.now()
+        running_tours = lookups.get_running_tours()
+        fresh_tours = set(
+            Game.objects.filter(
+                Q(tournament__standings_updated__isnull=True) | Q(updated__gt=F('tournament__standings_updated')),
+                status=FINISHED_STATUS,
+                tournament__is_running=True,
+            ).order_by().values_list('tournament__api_tour_id', flat=True).distinct()
+        )
+        tours = {
+            api_tour_id: tour
+            for api_tour_id, tour in running_tours.items()
+            if api_tour_id in fresh_tours or tour.standings is None
+        }
+        self.tables = self.get_tables(tours)
+        # Standings of the rest are derived, standings of the tours to parse are only taken from the API.
+        self.derivable = {
+            api_tour_id for api_tour_id, tour in tours.items()
+            if self.groups_cover(tour.standings, self.tables.get(api_tour_id, {}))
+        }
+        tours_to_parse = {
+            api_tour_id: tour
+            for api_tour_id, tour in tours.items()
+            if api_tour_id not in self.derivable
+        }
+        logger.info('Standings: %s tours to update, %s to parse.', len(tours), len(tours_to_parse))
+
+        return tours, tours_to_parse
+
+    def get_tables(self, tours: dict) -> dict:
+        # Teams stats of the current season {api_tour_id: {api_team_id: {'all': ..., 'home': ..., 'away': ...}}},
+        # aggregated by the DB.
+        if not tours:
+            return {}
+        api_tour_ids = {tour.id: api_tour_id for api_tour_id, tour in tours.items()}
+        seasons = Q()
+        for tour in tours.values():
+            seasons |= Q(tournament=tour.id, season=tour.current_season)
+        games = Game.objects.filter(
+            seasons,
+            Q(round__startswith='Regular Season') | Q(round__startswith='Group'),
+            status=FINISHED_STATUS,
+            home_goals_ft__isnull=False,
+            away_goals_ft__isnull=False,
+        ).order_by()
+
+        rows = []
+        for side, other in (('home', 'away'), ('away', 'home')):
+            goals, missed = f'{side}_goals_ft', f'{other}_goals_ft'
+            rows.extend(
+                (side, row) for row in games.values('tournament', team=F(f'{side}_team')).annotate(
+                    played=Count('id'),
+                    win=Count('id', filter=Q(**{f'{goals}__gt': F(missed)})),
+                    draw=Count('id', filter=Q(**{goals: F(missed)})),
+                    lose=Count('id', filter=Q(**{f'{goals}__lt': F(missed)})),
+                    goals_for=Sum(goals),
+                    goals_against=Sum(missed),
+                )
+            )
+        api_team_ids = lookups.get_team_api_ids(row['team'] for _, row in rows)
+
+        tables = {}
+        for side, row in rows:
+            table = tables.setdefault(api_tour_ids[row['tournament']], {})
+            team_stats = table.setdefault(
+                api_team_ids[row['team']],
+                {split: dict.fromkeys(STATS_FIELDS, 0) for split in ('all', 'home', 'away')},
+            )
+            for field in STATS_FIELDS:
+                team_stats[side][field] = row[field]
+                team_stats['all'][field] += row[field]
+
+        return tables
+
+    def groups_cover(self, standings: dict, table: dict) -> bool:
+        # Check if the standings can be derived from the games of the DB:
+        # all teams with games are in the groups of the standings, and every team
+        # of the groups has as many games in the DB, as it has in the stored standings.
+        # Otherwise (e.g. rounds, that are not counted, or a tour added mid-season)
+        # the derived table would be behind the stored one.
+        if not standings or not table:
+            return False
+        teams_in_groups = {team['api_team_id']: team for group in standings.values() for team in group}
+        if not table.keys() <= teams_in_groups.keys():
+            return False
+
+        return all(
+            api_team_id in table and table[api_team_id]['all']['played'] >= (team['stats_all']['played'] or 0)
+            for api_team_id, team in teams_in_groups.items()
+        )
 
-    def get_running_tours(self) -> dict:
-        # List of tournaments that will be assigned for each game (to prevent multiple queries).
-        return {tour.api_tour_id: tour for tour in Tournament.objects.filter(is_running=True)}
+    def get_team_names(self, api_team_ids: iter) -> dict:
+        return {
+            api_team_id: {'name': team.short_name, 'slug': team.slug, 'logo': team.logo.name}
+            for api_team_id, team in lookups.get_teams(api_team_ids).items()
+        }
 
     def prepare_data(self, standings_data: iter, tours: dict) -> dict:
-        teams_in_db = {
-            team['api_team_id']: {'name': team['short_name'], 'slug': team['slug'], 'logo': team['logo']}
-            for team in Team.objects.all().values('api_team_id', 'short_name', 'slug', 'logo')
+        # Set new standings to the tournaments, return only tournaments with changed standings.
+        standings_data = {data['id']: data for data in standings_data}
+        teams_in_db = self.get_team_names(
+            team['team']['id']
+            for data in standings_data.values()
+            for group in data['standings']
+            for team in group
+        )
+        teams_in_db.update(self.get_team_names(
+            api_team_id for table in self.tables.values() for api_team_id in table
+        ))
+
+        tours_to_update = {}
+        for tour_id, tour in tours.items():
+            if tour_id in standings_data:
+                tour_standings = self.parse_standings(standings_data[tour_id], teams_in_db)
+            elif tour_id in self.derivable:
+                tour_standings = self.derive_standings(tour.standings, self.tables.get(tour_id, {}), teams_in_db)
+            else:
+                continue
+            if tour_standings != tour.standings:
+                tour.standings = tour_standings
+                tours_to_update[tour_id] = tour
+
+        return tours_to_update
+
+    def parse_standings(self, data: dict, teams_in_db: dict) -> dict:
+        # Standings from the API.
+        tour_standings = {}
+        # List of standings: one element for ordinary championships (e.g. EPL),
+        # several elements for tournaments such as UEFA Champions League.
+        standings = data['standings']
+        for group in standings:
+            group_name = group[0]['group']
+            teams = []
+            for team in group:
+                team_data = {
+                    'rank': team['rank'],
+                    'rank_description': team['description'],
+                    'api_team_id': team['team']['id'],
+                    'team_name': teams_in_db.get(team['team']['id']) if teams_in_db.get(team['team']['id']) is
+                                not None else {'name': team['team']['name'], 'slug': None, 'logo': None},
+                    'status': team['status'],
+                    'stats_all': self.modify_stats(team['all'], team['points'], team['goalsDiff']),
+                    'stats_home': self.modify_stats(team['home']),
+                    'stats_away': self.modify_stats(team['away']),
+                }
+                teams.append(team_data)
+            tour_standings[group_name] = teams
+
+        return tour_standings
+
+    def derive_standings(self, standings: dict, table: dict, teams_in_db: dict) -> dict:
+        # Rank teams of every group by the stats from the DB.
+        # Groups and rank descriptions (e.g. 'Promotion - Champions League') stay as they are.
+        tour_standings = {}
+        for group_name, group in standings.items():
+            group = sorted(group, key=lambda team: team['rank'])
+            descriptions = [team['rank_description'] for team in group]
+            previous = {team['api_team_id']: team for team in group}
+            stats = {
+                api_team_id: {
+                    split: self.add_points(table[api_team_id][split]) if api_team_id in table
+                    else self.add_points(dict.fromkeys(STATS_FIELDS, 0))
+                    for split in ('all', 'home', 'away')
+                }
+                for api_team_id in previous
+            }
+            ranking = sorted(
+                previous,
+                key=lambda api_team_id: (
+                    -stats[api_team_id]['all']['points'],
+                    -stats[api_team_id]['all']['goals_diff'],
+                    -stats[api_team_id]['all']['goals_for'],
+                    previous[api_team_id]['rank'],
+                ),
+            )
+            teams = []
+            for rank, api_team_id in enumerate(ranking, start=1):
+                previous_rank = previous[api_team_id]['rank']
+                teams.append({
+                    'rank': rank,
+                    'rank_description': descriptions[rank - 1],
+                    'api_team_id': api_team_id,
+                    'team_name': teams_in_db.get(api_team_id, previous[api_team_id]['team_name']),
+                    'status': 'up' if rank < previous_rank else 'down' if rank > previous_rank else 'same',
+                    'stats_all': stats[api_team_id]['all'],
+                    'stats_home': stats[api_team_id]['home'],
+                    'stats_away': stats[api_team_id]['away'],
+                })
+            tour_standings[group_name] = teams
+
+        return tour_standings
+
+    def add_points(self, stats: dict) -> dict:
+        return {
+            **stats,
+            'points': stats['win'] * 3 + stats['draw'],
+            'goals_diff': stats['goals_for'] - stats['goals_against'],
         }
 
-        for data in standings_data:
-            tour_id = data['id']
-            tour_standings = {}
-            # List of standings: one element for ordinary championships (e.g. EPL),
-            # several elements for tournaments such as UEFA Champions League.
-            standings = data['standings']
-            for group in standings:
-                group_name = group[0]['group']
-                teams = []
-                for team in group:
-                    team_data = {
-                        'rank': team['rank'],
-                        'rank_description': team['description'],
-                        'api_team_id': team['team']['id'],
-                        'team_name': teams_in_db.get(team['team']['id']) if teams_in_db.get(team['team']['id']) is
-                                    not None else {'name': team['team']['name'], 'slug': None, 'logo': None},
-                        'status': team['status'],
-                        'stats_all': self.modify_stats(team['all'], team['points'], team['goalsDiff']),
-                        'stats_home': self.modify_stats(team['home']),
-                        'stats_away': self.modify_stats(team['away']),
-                    }
-                    teams.append(team_data)
-                tour_standings[group_name] = teams
-            tours[tour_id].standings = tour_standings
-
-        return tours
-
-    def rename_team(self, id):
-        return Team.objects.get(api_team_id=id)
-
     def modify_stats(self, data: dict, points: int = None, goals_diff: int = None) -> dict:
         stats = {
             'played': data['played'],
@@ -199,5 +505,11 @@ class StandingsUpdater():
 
         return stats
 
-    def update_tours(self, tours: dict) -> None:
-        Tournament.objects.bulk_update(tours.values(), ['standings'])
+    def update_tours(self, tours_to_update: dict, tours: dict) -> None:
+        # Write only changed standings, mark the checked tournaments.
+        metrics.inc('scout_rows_validated_total', len(tours), updater=type(self).__name__)
+        updated = Tournament.objects.bulk_update(tours_to_update.values(), ['standings'])
+        metrics.inc('scout_rows_updated_total', updated, updater=type(self).__name__, table='tournament')
+        Tournament.objects.filter(id__in=[tour.id for tour in tours.values()]).update(
+            standings_updated=self.checked_at,
+        )
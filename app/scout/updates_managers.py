@@ -3,9 +3,28 @@ Updates managers.
 
 Define the order of the updating process.
 
+Managers run inside the event loop of the API client, so several
+of them can share one loop (and one quota) during a scout run.
+Database work is done in a thread via sync_to_async,
+details are written by a thread of their own, while next batches are fetched.
+
 """
 
+import asyncio
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+from logs.logger import scout_logger as logger
+from scout.journal import Journal
+
+# The number of games, which details are written to the DB at once.
+CHECKPOINT_SIZE = 200
+# The number of parsed batches, that can wait for the writer.
+PIPELINE_DEPTH = 2
 
 
 class UpdatesManager(ABC):
@@ -14,16 +33,78 @@ class UpdatesManager(ABC):
         self.updater = updater
         self.parser = parser
 
-    @abstractmethod
     def start_updating(self) -> None:
         """ Start data parsing and DB updating """
+        self.parser.client.run(self.update())
+
+    @abstractmethod
+    async def update(self) -> None:
+        """ Parse data and update the DB within the client's event loop """
 
 
 class DetailsUpdatesManager(UpdatesManager):
 
-    def start_updating(self) -> None:
-        games_to_parse = self.updater.get_games_from_db()
-        games_details = self.parser.get_data(games_to_parse)
+    def __init__(self, updater, parser, journal: Journal = None):
+        super().__init__(updater, parser)
+        self.journal = journal or Journal(parser.url_tail)
+
+    async def update(self) -> None:
+        games_to_parse = await sync_to_async(self.get_games_to_parse)()
+        # Details, parsed by an interrupted run, are not requested again.
+        journaled = await sync_to_async(self.journal.load)(games_to_parse)
+        if journaled:
+            await sync_to_async(self.save_details)(journaled)
+        games_to_parse = [api_game_id for api_game_id in games_to_parse if api_game_id not in journaled]
+        # Batches are fetched, while the previous ones are written to the DB
+        # by the writer thread. The bounded queue holds back fetching, if the writer lags.
+        queue = asyncio.Queue(maxsize=PIPELINE_DEPTH)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='details-writer')
+        writer = asyncio.create_task(self.write(queue, executor))
+        try:
+            async for games_details in self.parser.batches(games_to_parse):
+                if games_details:
+                    # Each batch is journaled as soon as it is parsed.
+                    await sync_to_async(self.journal.append, thread_sensitive=False)(games_details)
+                    await self.put(queue, games_details, writer)
+            await self.put(queue, None, writer)
+            await writer
+            if self.parser.failed:
+                logger.warning(
+                    '%s: requests of %s games have failed, they are left for the next run.',
+                    self.parser.url_tail, len(self.parser.failed),
+                )
+        finally:
+            writer.cancel()
+            await asyncio.get_running_loop().run_in_executor(executor, connections.close_all)
+            executor.shutdown()
+        await sync_to_async(self.journal.clear)()
+
+    async def put(self, queue: asyncio.Queue, games_details: Union[dict, None], writer: asyncio.Task) -> None:
+        # Wait for a free place in the queue, unless the writer has failed.
+        put = asyncio.ensure_future(queue.put(games_details))
+        await asyncio.wait({put, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            writer.result()
+
+    async def write(self, queue: asyncio.Queue, executor: ThreadPoolExecutor) -> None:
+        # Write parsed details to the DB in checkpoints, till None is got.
+        loop = asyncio.get_running_loop()
+        checkpoint = {}
+        while True:
+            games_details = await queue.get()
+            if games_details is not None:
+                checkpoint.update(games_details)
+            if checkpoint and (games_details is None or len(checkpoint) >= CHECKPOINT_SIZE):
+                await loop.run_in_executor(executor, self.save_details, checkpoint)
+                checkpoint = {}
+            if games_details is None:
+                return
+
+    def get_games_to_parse(self) -> list:
+        return list(self.updater.get_games_from_db())
+
+    def save_details(self, games_details: dict) -> None:
         games_to_update = self.updater.get_games_to_update(games_details)
         self.updater.update_details(games_to_update, games_details)
         self.updater.update_games(games_to_update)
@@ -31,17 +112,42 @@ class DetailsUpdatesManager(UpdatesManager):
 
 class ScoresUpdatesManager(UpdatesManager):
 
-    def start_updating(self) -> None:
-        tours_to_parse = self.updater.get_running_tours()
-        games = self.parser.get_data(tours_to_parse)
+    async def update(self) -> None:
+        tours_to_parse = await sync_to_async(self.updater.get_running_tours)()
+        games = await self.parser.tasker(tours_to_parse)
+        # Tours, which requests have failed, stay due.
+        checked_tours = {
+            api_tour_id: tour for api_tour_id, tour in tours_to_parse.items()
+            if api_tour_id not in self.parser.failed
+        }
+        await sync_to_async(self.save_games)(games, tours_to_parse, checked_tours)
+
+    def save_games(self, games: list, tours_to_parse: dict, checked_tours: dict) -> None:
         data_to_load = self.updater.prepare_data(games, tours_to_parse)
         self.updater.update_or_create_games(data_to_load)
+        self.updater.mark_checked(checked_tours)
 
 
 class StandingsUpdatesManager(UpdatesManager):
 
-    def start_updating(self) -> None:
-        tours_to_parse = self.updater.get_running_tours()
-        standings_data = self.parser.get_data(tours_to_parse)
-        tours_to_update = self.updater.prepare_data(standings_data, tours_to_parse)
-        self.updater.update_tours(tours_to_update)
+    async def update(self) -> None:
+        tours, tours_to_parse = await sync_to_async(self.updater.get_tours_to_update)()
+        standings_data = await self.parser.tasker(tours_to_parse)
+        # Tours, which requests have failed, stay due.
+        checked_tours = {
+            api_tour_id: tour for api_tour_id, tour in tours.items()
+            if api_tour_id not in self.parser.failed
+        }
+        await sync_to_async(self.save_standings)(standings_data, tours, checked_tours)
+
+    def save_standings(self, standings_data: iter, tours: dict, checked_tours: dict) -> None:
+        tours_to_update = self.updater.prepare_data(standings_data, tours)
+        self.updater.update_tours(tours_to_update, checked_tours)
+
+
+class LiveUpdatesManager(UpdatesManager):
+
+    async def update(self) -> None:
+        tours, live_ids = await sync_to_async(self.updater.get_live_state)()
+        games = await self.parser.tasker(tours, live_ids)
+        await sync_to_async(self.updater.update_games)(games)